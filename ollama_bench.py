@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+import contextlib
+from typing import Any, Callable, Dict, List, Optional
+
+from ollama_mock_server import MockOllamaServer
+
+DEFAULT_BASELINE = "ollama_bench_baseline.json"
+# Relative growth over the baseline that counts as a regression
+DEFAULT_TOLERANCE = 0.30
+# Changes smaller than this (ms per iteration, KiB of peak memory) are noise
+MIN_CPU_DELTA_MS = 2.0
+MIN_MEMORY_DELTA_KB = 256.0
+
+def _cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def measure(fn: Callable[[], Any], iterations: int, call_metrics) -> Dict[str, float]:
+    """
+    Time a benchmark function
+
+    CPU time and wall time are measured over all iterations; peak Python memory comes
+    from one extra iteration under tracemalloc, so its overhead does not skew timings.
+
+    Args:
+        fn: Benchmark body
+        iterations: Number of timed iterations
+        call_metrics: The tool tester's CALL_METRICS, to count chat calls
+
+    Returns:
+        Dictionary with wall and CPU ms per iteration, chat calls per iteration, mean
+        wall ms per chat call and peak traced memory in KiB
+    """
+    fn()  # warm up imports, connection pools and caches
+    call_metrics.clear()
+    cpu_start, wall_start = _cpu_seconds(), time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    wall = time.perf_counter() - wall_start
+    cpu = _cpu_seconds() - cpu_start
+    calls = call_metrics.snapshot()
+
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "wall_ms": wall / iterations * 1000,
+        "cpu_ms": cpu / iterations * 1000,
+        "chat_calls": len(calls) / iterations,
+        "ms_per_call": sum(r["wall_s"] for r in calls) / len(calls) * 1000 if calls else 0.0,
+        "peak_kb": peak / 1024,
+    }
+
+def synthetic_report_inputs(models: int = 100, calls_per_model: int = 50) -> Dict[str, Any]:
+    """Result dictionaries of a large sweep, for timing generate_report on its own"""
+    basic, advanced, alternative, interface, calls = {}, {}, {}, {}, []
+    for i in range(models):
+        m = f"model-{i}:7b"
+        ok = i % 2 == 0
+        basic[m] = {"success": ok, "reason": "synthetic", "metrics": {"tool_calls_made": ok}}
+        if ok:
+            advanced[m] = {f"query {q}": {"success": True, "reason": "", "response": "x" * 200} for q in range(3)}
+        else:
+            alternative[m] = {k: {"success": False, "response": None, "reason": "synthetic"}
+                              for k in ("direct_json", "alternate_search")}
+            interface[m] = {"success": True, "response": "y" * 200, "reason": None}
+        for c in range(calls_per_model):
+            calls.append({"model": m, "test": ("tool_support", "advanced_search")[c % 2], "wall_s": 0.1 + c / 1000,
+                          "error": False, "load_duration_s": 0.01, "prompt_tps": 500.0, "gen_tps": 50.0,
+                          "streamed": c % 3 == 0, "ttft_s": 0.05, "itl_mean_s": 0.02, "itl_p95_s": 0.03})
+    return {"basic_results": basic, "advanced_results": advanced, "alternative_results": alternative,
+            "interface_results": interface, "call_metrics": calls}
+
+def run_benchmarks(iterations: int) -> Dict[str, Dict[str, float]]:
+    """
+    Run every benchmark against the mock server
+
+    The tool tester is imported here, after OLLAMA_HOST and the search URLs point at the
+    mock server, and from the current (temporary) directory, so its log file, caches
+    and reports stay out of the working tree.
+    """
+    import ollama_tool_tester as tt
+
+    # DDGS would go to the real network; the Instant Answer fallback goes to the stand-in
+    tt.DDGS_AVAILABLE = False
+    tt.configure_search_cache(None)
+    tt.configure_transcript(os.path.join(os.getcwd(), "bench_transcript.jsonl"))
+    for handler in logging.getLogger().handlers:
+        if not isinstance(handler, logging.FileHandler):
+            handler.setLevel(logging.WARNING)
+
+    queries = iter(range(10**9))
+    report_inputs = synthetic_report_inputs()
+    main_args = ["--no-search-cache", "--no-checkpoint", "--no-results-db", "--search-deadline", "5"]
+    benchmarks: Dict[str, Callable[[], Any]] = {
+        "test_model_tool_support": lambda: tt.test_model_tool_support("mock-tools:8b"),
+        # A new query every time, so the composite always reaches every backend
+        "composite_search": lambda: tt.composite_search(f"bench query {next(queries)}"),
+        "generate_report": lambda: tt.generate_report(**report_inputs),
+        "main": lambda: tt.main(main_args),
+    }
+
+    results = {}
+    # main() prints where it wrote its report; keep stdout for the results table
+    with contextlib.redirect_stdout(sys.stderr):
+        for name, fn in benchmarks.items():
+            results[name] = measure(fn, iterations, tt.CALL_METRICS)
+            print(f"  {name}: {results[name]['cpu_ms']:.1f} ms CPU per iteration")
+    return results
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float = DEFAULT_TOLERANCE
+) -> List[str]:
+    """
+    Find benchmarks whose CPU time or peak memory regressed against a baseline
+
+    Returns:
+        One message per regression
+    """
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if cur["cpu_ms"] > base["cpu_ms"] * (1 + tolerance) and cur["cpu_ms"] - base["cpu_ms"] > MIN_CPU_DELTA_MS:
+            regressions.append(f"{name}: CPU {base['cpu_ms']:.1f} -> {cur['cpu_ms']:.1f} ms per iteration")
+        if (cur["peak_kb"] > base["peak_kb"] * (1 + tolerance)
+                and cur["peak_kb"] - base["peak_kb"] > MIN_MEMORY_DELTA_KB):
+            regressions.append(f"{name}: peak memory {base['peak_kb']:.0f} -> {cur['peak_kb']:.0f} KiB")
+    return regressions
+
+def results_table(results: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]]) -> str:
+    lines = ["| Benchmark | Wall (ms) | CPU (ms) | Baseline CPU (ms) | Chat Calls | ms per Call | Peak Memory (KiB) |",
+             "|-----------|-----------|----------|-------------------|------------|-------------|-------------------|"]
+    for name, r in results.items():
+        base = (baseline or {}).get(name)
+        base_cpu = f"{base['cpu_ms']:.1f}" if base else "-"
+        lines.append(f"| {name} | {r['wall_ms']:.1f} | {r['cpu_ms']:.1f} | {base_cpu} | {r['chat_calls']:.0f} "
+                     f"| {r['ms_per_call']:.2f} | {r['peak_kb']:.0f} |")
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the harness overhead benchmarks; returns 1 if any regressed against the baseline"""
+    parser = argparse.ArgumentParser(description="Benchmark the tool tester's own overhead against a mock server")
+    parser.add_argument("-n", "--iterations", type=int, default=5, help="Timed iterations per benchmark (default: 5)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help=f"Baseline results file (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--require-baseline", action="store_true",
+                        help="Fail when there is no baseline to compare against, instead of passing")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative growth over the baseline that fails the run (default: 0.3)")
+    args = parser.parse_args(argv)
+    baseline_path = os.path.abspath(args.baseline)
+
+    with MockOllamaServer() as server, tempfile.TemporaryDirectory() as workdir:
+        os.environ["OLLAMA_HOST"] = server.url
+        os.environ["DDG_API_URL"] = server.ddg_url
+        os.environ["BRAVE_API_URL"] = server.brave_url
+        os.environ["BRAVE_API_KEY"] = "mock"
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            results = run_benchmarks(args.iterations)
+        finally:
+            os.chdir(cwd)
+
+    baseline = None
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    print(results_table(results, baseline))
+
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {baseline_path}")
+        return 0
+    if baseline is None:
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one")
+        return 1 if args.require_baseline else 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for r in regressions:
+        print(f"REGRESSION {r}")
+    if not regressions:
+        print("\nNo regressions")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
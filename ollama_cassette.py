@@ -0,0 +1,214 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+from ollama_search_cache import normalize_query
+
+RECORD = "record"
+REPLAY = "replay"
+
+def content_hash(payload: Any) -> str:
+    """
+    Stable SHA-256 hash of a JSON-serializable payload
+
+    Args:
+        payload: Request data to hash
+
+    Returns:
+        Hex digest of the payload serialized with sorted keys
+    """
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class ChatCassette:
+    """
+    Directory of recorded Ollama chat and embed responses and search results
+
+    In record mode every chat response is stored under a content hash of the model
+    digest, messages, tools and options, every embed response under a hash of the
+    model digest and inputs; search results are stored under their backend and
+    normalized query. In replay mode those recordings are served back so the whole
+    test flow can run without an Ollama server or network access.
+
+    Identical requests made several times are recorded as a list and replayed in the
+    same order; once a list is exhausted its last recording is repeated.
+
+    Layout:
+        models.json         model name -> digest
+        show.json           model name -> metadata summary used by the pre-screen
+        chat/<hash>.json    {"model", "request", "recordings": [...]}
+        embed/<hash>.json   {"model", "inputs", "recordings": [...]}
+        search/<hash>.json  {"backend", "query", "recordings": [...]}
+    """
+
+    def __init__(self, path: str, mode: str):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == REPLAY and not os.path.isdir(path):
+            raise FileNotFoundError(f"Cassette directory not found: {path}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._replay_positions: Dict[str, int] = {}
+        for sub in ("chat", "embed", "search"):
+            os.makedirs(os.path.join(path, sub), exist_ok=True)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == RECORD
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def _file(self, kind: str, key: str) -> str:
+        return os.path.join(self.path, kind, f"{key}.json")
+
+    def _append(self, kind: str, key: str, header: Dict[str, Any], recording: Dict[str, Any]) -> None:
+        fname = self._file(kind, key)
+        with self._lock:
+            if os.path.exists(fname):
+                with open(fname) as f:
+                    data = json.load(f)
+            else:
+                data = {**header, "recordings": []}
+            data["recordings"].append(recording)
+            tmp = f"{fname}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2, default=str)
+            os.replace(tmp, fname)
+
+    def _next(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        fname = self._file(kind, key)
+        with self._lock:
+            if not os.path.exists(fname):
+                return None
+            with open(fname) as f:
+                recordings: List[Dict[str, Any]] = json.load(f)["recordings"]
+            pos = self._replay_positions.get(f"{kind}/{key}", 0)
+            self._replay_positions[f"{kind}/{key}"] = pos + 1
+            return recordings[min(pos, len(recordings) - 1)]
+
+    @staticmethod
+    def chat_key(model_name: str, digest: Optional[str], request: Dict[str, Any]) -> str:
+        """
+        Content hash identifying a chat request
+
+        Args:
+            model_name: Name of the model
+            digest: Model digest from ollama.list() (None if unknown)
+            request: Chat keyword arguments; only messages, tools and options are hashed
+
+        Returns:
+            Hex digest
+        """
+        return content_hash({
+            "model": model_name,
+            "digest": digest,
+            "messages": request.get("messages"),
+            "tools": request.get("tools"),
+            "options": request.get("options"),
+        })
+
+    def record_chat(
+        self,
+        model_name: str,
+        digest: Optional[str],
+        request: Dict[str, Any],
+        response: Dict[str, Any],
+        wall_s: float,
+        stream_stats: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Store a chat response with its measured timings"""
+        header = {"model": model_name, "digest": digest,
+                  "request": {k: request.get(k) for k in ("messages", "tools", "options")}}
+        self._append("chat", self.chat_key(model_name, digest, request), header,
+                     {"response": response, "wall_s": wall_s, "stream_stats": stream_stats})
+
+    def replay_chat(
+        self,
+        model_name: str,
+        digest: Optional[str],
+        request: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up a recorded chat response
+
+        Returns:
+            Dictionary with "response", "wall_s" and "stream_stats", or None if this
+            request was never recorded
+        """
+        return self._next("chat", self.chat_key(model_name, digest, request))
+
+    def record_embed(self, model_name: str, digest: Optional[str], inputs: List[str],
+                     response: Dict[str, Any], wall_s: float) -> None:
+        """Store an embed response with its measured wall time"""
+        key = content_hash({"model": model_name, "digest": digest, "inputs": inputs})
+        self._append("embed", key, {"model": model_name, "inputs": inputs}, {"response": response, "wall_s": wall_s})
+
+    def replay_embed(self, model_name: str, digest: Optional[str], inputs: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a recorded embed response
+
+        Returns:
+            Dictionary with "response" and "wall_s", or None if this request was never
+            recorded
+        """
+        return self._next("embed", content_hash({"model": model_name, "digest": digest, "inputs": inputs}))
+
+    def record_search(self, backend: str, query: str, results: Any) -> None:
+        """Store the results of a search backend"""
+        key = content_hash({"backend": backend, "query": normalize_query(query)})
+        self._append("search", key, {"backend": backend, "query": query}, {"results": results})
+
+    def replay_search(self, backend: str, query: str) -> Optional[Any]:
+        """
+        Look up recorded search results
+
+        Returns:
+            The recorded results, or None if this search was never recorded
+        """
+        rec = self._next("search", content_hash({"backend": backend, "query": normalize_query(query)}))
+        return rec["results"] if rec else None
+
+    def record_models(self, digests: Dict[str, Optional[str]]) -> None:
+        """Store the model list (name -> digest) of the recorded run"""
+        with self._lock:
+            with open(os.path.join(self.path, "models.json"), "w") as f:
+                json.dump(digests, f, indent=2)
+
+    def record_show(self, model_name: str, info: Dict[str, Any]) -> None:
+        """Store the metadata summary of a model (see ollama_model_info)"""
+        fname = os.path.join(self.path, "show.json")
+        with self._lock:
+            data = {}
+            if os.path.exists(fname):
+                with open(fname) as f:
+                    data = json.load(f)
+            data[model_name] = info
+            with open(fname, "w") as f:
+                json.dump(data, f, indent=2)
+
+    def replay_show(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            The recorded metadata summary of a model, or None if none was recorded
+        """
+        fname = os.path.join(self.path, "show.json")
+        if not os.path.exists(fname):
+            return None
+        with open(fname) as f:
+            return json.load(f).get(model_name)
+
+    def models(self) -> Dict[str, Optional[str]]:
+        """
+        Returns:
+            The recorded model list (name -> digest), empty if none was recorded
+        """
+        fname = os.path.join(self.path, "models.json")
+        if not os.path.exists(fname):
+            return {}
+        with open(fname) as f:
+            return json.load(f)
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_CHECKPOINT_PATH = "ollama_checkpoint.jsonl"
+
+def new_run_id(started: Optional[float] = None) -> str:
+    """
+    Identifier of a run: its local start time down to the microsecond
+
+    Two runs started within the same second still get different identifiers, which
+    sort in start order.
+
+    Args:
+        started: Start time (seconds since the epoch; default: now)
+    """
+    started = time.time() if started is None else started
+    return f"{time.strftime('%Y%m%d_%H%M%S', time.localtime(started))}_{int(started % 1 * 1e6):06d}"
+
+class CheckpointStore:
+    """
+    Append-only JSONL store of per-model test results
+
+    Every finished test stage (basic tool test, advanced or alternative track,
+    interface test) is appended and flushed to disk as soon as it completes, tagged
+    with the run it belongs to and the digest of the model(s) it tested. A later run
+    can then reuse stored results instead of testing again:
+
+    - resume: reuse every result of the previous run if that run never completed
+    - incremental: reuse the latest result of any run whose model digest still matches
+
+    Records:
+        {"type": "run", "run_id", "started", "models"}
+        {"type": "result", "run_id", "stage", "key", "digest", "value", "ts"}
+        {"type": "complete", "run_id", "ts"}
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH, resume: bool = False, incremental: bool = False):
+        self.path = path
+        self.resume = resume
+        self.incremental = incremental
+        self._lock = threading.Lock()
+        self.reused: Dict[str, int] = {}
+        self.run_id = new_run_id()
+
+        runs: List[str] = []
+        completed = set()
+        # (stage, key) -> list of (run_id, digest, value), oldest first
+        self._results: Dict[Tuple[str, str], List[Tuple[str, Optional[str], Any]]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash; everything before it is intact
+                        continue
+                    if rec["type"] == "run":
+                        runs.append(rec["run_id"])
+                    elif rec["type"] == "complete":
+                        completed.add(rec["run_id"])
+                    elif rec["type"] == "result":
+                        self._results.setdefault((rec["stage"], rec["key"]), []).append(
+                            (rec["run_id"], rec.get("digest"), rec["value"])
+                        )
+
+        self.resumed_run = None
+        if resume and runs and runs[-1] not in completed:
+            # Keep writing under the interrupted run so it can be resumed again
+            self.resumed_run = self.run_id = runs[-1]
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _write(self, rec: Dict[str, Any]) -> None:
+        with self._lock:
+            self._file.write(json.dumps(rec, default=str) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def start_run(self, models: List[str]) -> None:
+        """Record the start of a sweep (a resumed run keeps its original record)"""
+        if self.resumed_run is None:
+            self._write({"type": "run", "run_id": self.run_id, "started": time.time(), "models": models})
+
+    def finish_run(self) -> None:
+        """Mark the current run as complete, so it is not resumed"""
+        self._write({"type": "complete", "run_id": self.run_id, "ts": time.time()})
+
+    def lookup(self, stage: str, key: str, digest: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Find a stored result that may be reused for a test stage
+
+        Args:
+            stage: Name of the test stage
+            key: Model name(s) the stage was run for
+            digest: Current digest of those models (None if unknown)
+
+        Returns:
+            {"value": stored result} or None if the stage has to run
+        """
+        with self._lock:
+            entries = self._results.get((stage, key), [])
+        for run_id, stored_digest, value in reversed(entries):
+            if self.resumed_run is not None and run_id == self.resumed_run:
+                hit = True
+            else:
+                hit = self.incremental and digest is not None and stored_digest == digest
+            if hit:
+                with self._lock:
+                    self.reused[stage] = self.reused.get(stage, 0) + 1
+                return {"value": value}
+        return None
+
+    def save(self, stage: str, key: str, digest: Optional[str], value: Any) -> None:
+        """Append the result of a finished test stage"""
+        with self._lock:
+            self._results.setdefault((stage, key), []).append((self.run_id, digest, value))
+        self._write({"type": "result", "run_id": self.run_id, "stage": stage, "key": key,
+                     "digest": digest, "value": value, "ts": time.time()})
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+from typing import Any, Dict, Optional
+
+from ollama_conversation import Conversation, canonical_json
+
+# Context window the server gives a model when the request does not set num_ctx
+DEFAULT_NUM_CTX = int(os.environ.get("OLLAMA_CONTEXT_LENGTH") or 4096)
+# Share of the context window the prompt may fill; the rest is left for the answer
+DEFAULT_THRESHOLD = 0.75
+# Characters a summarized tool result keeps
+DEFAULT_SUMMARY_CHARS = 300
+# Items of a list result (e.g. search results) a summary keeps, and their length
+SUMMARY_ITEMS = 3
+SUMMARY_ITEM_CHARS = 80
+
+SUMMARIZED = "summarized"
+DROPPED = "dropped"
+
+def _shorten(text: str, limit: int) -> str:
+    return text if len(text) <= limit else f"{text[:limit].rsplit(' ', 1)[0]}..."
+
+def summarize_result(content: str, chars: int = DEFAULT_SUMMARY_CHARS) -> str:
+    """
+    Shorten a tool result that the model has already answered to
+
+    A JSON list (such as search results) keeps its first SUMMARY_ITEMS items, cut
+    short, and the number of items left out; any other result keeps its first chars
+    characters.
+    """
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        data = None
+    if isinstance(data, list):
+        items = [_shorten(item if isinstance(item, str) else canonical_json(item), SUMMARY_ITEM_CHARS)
+                 for item in data[:SUMMARY_ITEMS]]
+        if len(data) > SUMMARY_ITEMS:
+            items.append(f"[{len(data) - SUMMARY_ITEMS} more results compacted]")
+        return canonical_json(items)
+    if len(content) <= chars:
+        return content
+    return f"{_shorten(content, chars)} [{len(content) - chars} characters compacted]"
+
+class ContextBudget:
+    """
+    Keeps multi-turn conversations inside a model's context window
+
+    The window is the smaller of the server's num_ctx and the model's trained context
+    length. Before a turn, compact() estimates the prompt's tokens (see
+    Conversation.prompt_tokens); above threshold of the window it compacts the tool
+    results of earlier turns, oldest first: first each is summarized (see
+    summarize_result), then, if the prompt is still too long, replaced by a note that
+    it was dropped. The results of the latest turn, which the model has not answered
+    yet, are never touched.
+
+    Compaction edits messages the server has cached, so the prompt is evaluated again
+    from the first edited message on; it is the price of not being truncated by the
+    server, which keeps the end of the prompt and silently loses its start.
+    """
+
+    def __init__(self, num_ctx: int = DEFAULT_NUM_CTX, threshold: float = DEFAULT_THRESHOLD,
+                 summary_chars: int = DEFAULT_SUMMARY_CHARS):
+        self.num_ctx = num_ctx
+        self.threshold = threshold
+        self.summary_chars = summary_chars
+
+    def window(self, context_length: Optional[int] = None) -> int:
+        """Tokens of a model's context window, given its trained context length"""
+        return min(self.num_ctx, context_length) if context_length else self.num_ctx
+
+    def compact(self, conv: Conversation, context_length: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Compact a conversation's older tool results if its prompt nears the window
+
+        Args:
+            conv: Conversation about to be sent
+            context_length: The model's trained context length, if known
+
+        Returns:
+            None if nothing had to be done, else a dictionary with window,
+            before_tokens, after_tokens, summarized, dropped, first_edited (index of the
+            first edited message), over (whether the prompt is still above the
+            threshold) and compact_s
+        """
+        window = self.window(context_length)
+        target = int(window * self.threshold)
+        before = conv.prompt_tokens()
+        if before <= target:
+            return None
+
+        start = time.perf_counter()
+        answered = max((i for i, m in enumerate(conv.messages) if m["role"] == "assistant"), default=-1)
+        older = [i for i in range(answered) if conv.messages[i]["role"] == "tool"]
+        counts = {SUMMARIZED: 0, DROPPED: 0}
+        edited = []
+        for level in (SUMMARIZED, DROPPED):
+            for i in older:
+                if conv.prompt_tokens() <= target:
+                    break
+                if conv.compacted.get(i) == DROPPED or (level == SUMMARIZED and i in conv.compacted):
+                    continue
+                message = conv.messages[i]
+                if level == SUMMARIZED:
+                    content = summarize_result(message["content"], self.summary_chars)
+                else:
+                    content = f"[Result of {message.get('name') or 'tool'} dropped to fit the context window]"
+                if len(content) < len(message["content"]):
+                    conv.replace(i, content, level)
+                    counts[level] += 1
+                    edited.append(i)
+        after = conv.prompt_tokens()
+        return {
+            "window": window,
+            "before_tokens": before,
+            "after_tokens": after,
+            "summarized": counts[SUMMARIZED],
+            "dropped": counts[DROPPED],
+            "first_edited": min(edited) if edited else None,
+            "over": after > target,
+            "compact_s": time.perf_counter() - start,
+        }
@@ -0,0 +1,139 @@
+import json
+from typing import Any, Dict, List, Optional
+
+# Characters per prompt token assumed when no response reported a prompt token count
+CHARS_PER_TOKEN = 4.0
+
+def canonical_json(value: Any) -> str:
+    """Serialize a value the same way every time (sorted keys, fixed separators)"""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+def _message_chars(message: Dict[str, Any]) -> int:
+    chars = len(message.get("content") or "")
+    if message.get("tool_calls"):
+        chars += len(canonical_json(message["tool_calls"]))
+    return chars
+
+class Conversation:
+    """
+    Chat message list kept byte-stable between turns, so the server can reuse the
+    prompt evaluation it cached for the previous turn
+
+    Messages are only appended, never edited or dropped (unless the conversation
+    outgrows the model's context window; see ContextBudget), and the same tool list is
+    sent on every turn (the template renders it into the prompt). Each turn appends the
+    assistant message the model produced, tool calls included, before any tool
+    results, so the next prompt starts with exactly the tokens the server already
+    holds. Tool results are serialized with canonical_json.
+
+    Prompt reuse is estimated from each response's prompt_eval_count, which only counts
+    the tokens the server had to evaluate. The full prompt size is estimated from its
+    characters, at the lowest characters per evaluated token seen in the conversation
+    (the turn evaluated most completely); tokens that were not evaluated were reused.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        name: str,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        messages: Optional[List[Dict[str, Any]]] = None
+    ):
+        self.model = model
+        self.name = name
+        self.tools = tools
+        self.messages: List[Dict[str, Any]] = []
+        self._chars = 0
+        # Message index to how its content was compacted (see replace)
+        self.compacted: Dict[int, str] = {}
+        # (prompt characters, evaluated tokens, prompt eval seconds) per answered turn
+        self._turns: List[tuple] = []
+        for message in messages or []:
+            self._append(message)
+
+    def _append(self, message: Dict[str, Any]) -> None:
+        self.messages.append(message)
+        self._chars += _message_chars(message)
+
+    def user(self, content: str) -> None:
+        self._append({"role": "user", "content": content})
+
+    def tool(self, name: str, result: Any) -> None:
+        """Append a tool result; non-string results are serialized canonically"""
+        content = result if isinstance(result, str) else canonical_json(result)
+        self._append({"role": "tool", "name": name, "content": content})
+
+    def replace(self, index: int, content: str, how: str) -> None:
+        """Replace the content of an earlier message, noting how it was compacted"""
+        self._chars += len(content) - len(self.messages[index].get("content") or "")
+        self.messages[index] = {**self.messages[index], "content": content}
+        self.compacted[index] = how
+
+    def _chars_per_token(self) -> float:
+        ratios = [chars / evaluated for chars, evaluated, _ in self._turns if chars and evaluated]
+        return min(ratios) if ratios else CHARS_PER_TOKEN
+
+    def prompt_tokens(self) -> int:
+        """Estimated tokens of the prompt the next turn would send, tool definitions included"""
+        chars = self._chars + (len(canonical_json(self.tools)) if self.tools else 0)
+        return round(chars / self._chars_per_token())
+
+    def add_response(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Record a chat response's prompt usage and append the assistant message
+
+        Args:
+            response: Response dictionary of a chat call made with this conversation's
+                messages (an {"error": ...} response is recorded but not appended)
+
+        Returns:
+            The response's tool calls with JSON-string arguments parsed
+        """
+        evaluated = response.get("prompt_eval_count")
+        # Errors and streams cut short before the final chunk carry no counters
+        if evaluated is not None:
+            # The template renders the tool definitions into the prompt as well
+            chars = self._chars + (len(canonical_json(self.tools)) if self.tools else 0)
+            self._turns.append((chars, evaluated, (response.get("prompt_eval_duration") or 0) / 1e9))
+        if "error" in response:
+            return []
+
+        message = response.get("message") or {}
+        calls = []
+        for call in message.get("tool_calls") or []:
+            args = call["function"].get("arguments") or {}
+            if isinstance(args, str):
+                # Malformed arguments stay a string; calling the tool with them then fails
+                try:
+                    args = json.loads(args)
+                except json.JSONDecodeError:
+                    pass
+            calls.append({"function": {"name": call["function"]["name"], "arguments": args}})
+        assistant: Dict[str, Any] = {"role": "assistant", "content": message.get("content") or ""}
+        if calls:
+            assistant["tool_calls"] = calls
+        self._append(assistant)
+        return calls
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Prompt token reuse of the conversation so far
+
+        Returns:
+            Dictionary with model, name, turns (that reported token counts), prompt_tokens
+            (estimated), evaluated_tokens, reused_tokens and prompt_eval_s
+        """
+        chars_per_token = self._chars_per_token()
+        prompt_tokens = evaluated_tokens = 0
+        for chars, evaluated, _ in self._turns:
+            prompt_tokens += max(evaluated, round(chars / chars_per_token))
+            evaluated_tokens += evaluated
+        return {
+            "model": self.model,
+            "name": self.name,
+            "turns": len(self._turns),
+            "prompt_tokens": prompt_tokens,
+            "evaluated_tokens": evaluated_tokens,
+            "reused_tokens": prompt_tokens - evaluated_tokens,
+            "prompt_eval_s": sum(t[2] for t in self._turns),
+        }
@@ -0,0 +1,186 @@
+import time
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from ollama_stats import percentile
+
+DEFAULT_BATCH_SIZES = (1, 8, 32)
+# Input lengths in words
+DEFAULT_INPUT_WORDS = (16, 128, 512)
+DEFAULT_REPEATS = 3
+# Inputs of the similarity check (plus one duplicate)
+QUALITY_INPUTS = 16
+QUALITY_WORDS = 32
+# Cosine similarity two embeddings of the same text must reach
+DUPLICATE_SIMILARITY = 0.99
+
+# Vocabulary of the synthetic inputs; texts on one topic should embed closer to each
+# other than to texts on the other topics
+TOPICS: Dict[str, List[str]] = {
+    "astronomy": "star planet orbit galaxy telescope comet nebula moon solar eclipse gravity asteroid "
+                 "astronaut rocket satellite cosmic light-year supernova".split(),
+    "cooking": "recipe oven flour butter garlic simmer bake saucepan onion pepper dough roast "
+               "kitchen spice tomato knife boil dinner".split(),
+    "finance": "stock bond interest loan investor dividend market bank inflation portfolio credit "
+               "equity budget tax revenue profit currency".split(),
+    "medicine": "patient doctor vaccine surgery diagnosis symptom hospital nurse therapy infection "
+                "dose clinic antibiotic fever heart blood treatment".split(),
+}
+_FILLER = "the a of and in to with for on is that by from about".split()
+
+def make_inputs(count: int, words: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    Deterministic synthetic texts, cycling through TOPICS
+
+    Args:
+        count: Number of texts
+        words: Words per text
+        seed: Seed of the word choice; different seeds give different texts
+
+    Returns:
+        (topic, text) per text
+    """
+    rng = random.Random(seed)
+    names = list(TOPICS)
+    texts = []
+    for i in range(count):
+        topic = names[i % len(names)]
+        # Two topic words to one filler word, like ordinary prose on a subject
+        texts.append((topic, " ".join(rng.choice(_FILLER) if j % 3 == 2 else rng.choice(TOPICS[topic])
+                                      for j in range(words))))
+    return texts
+
+def similarity_check(embeddings: Sequence[Sequence[float]], topics: Sequence[str]) -> Dict[str, Any]:
+    """
+    Sanity-check a batch of embeddings with one vectorized cosine similarity matrix
+
+    The batch must hold texts labelled with topics followed by a repeat of the first
+    text. It passes when every vector is finite and non-zero, the repeat embeds like the
+    original and texts on the same topic are more similar than texts on different ones.
+
+    Args:
+        embeddings: Returned vectors, one per input
+        topics: Topic of each input except the trailing duplicate
+
+    Returns:
+        Dictionary with dimensions, duplicate_similarity, same_topic_similarity,
+        cross_topic_similarity, passed and reason
+    """
+    result: Dict[str, Any] = {"dimensions": None, "duplicate_similarity": None, "same_topic_similarity": None,
+                              "cross_topic_similarity": None, "passed": False, "reason": None}
+    if not NUMPY_AVAILABLE:
+        result["reason"] = "numpy not installed"
+        return result
+    try:
+        matrix = np.asarray(embeddings, dtype=np.float64)
+    except ValueError:
+        result["reason"] = "Vectors have different dimensions"
+        return result
+    n = len(topics)
+    if matrix.ndim != 2 or matrix.shape[0] != n + 1:
+        result["reason"] = f"Expected {n + 1} vectors, got shape {matrix.shape}"
+        return result
+    result["dimensions"] = int(matrix.shape[1])
+    norms = np.linalg.norm(matrix, axis=1)
+    if not np.isfinite(matrix).all() or (norms == 0).any():
+        result["reason"] = "Non-finite or zero vectors"
+        return result
+
+    unit = matrix / norms[:, None]
+    sims = unit @ unit.T
+    labels = np.asarray(topics)
+    same = labels[:, None] == labels[None, :]
+    off_diagonal = ~np.eye(n, dtype=bool)
+    distinct = sims[:n, :n]
+    result["duplicate_similarity"] = float(sims[0, n])
+    result["same_topic_similarity"] = float(distinct[same & off_diagonal].mean())
+    result["cross_topic_similarity"] = float(distinct[~same].mean())
+    if result["duplicate_similarity"] < DUPLICATE_SIMILARITY:
+        result["reason"] = "The same text embedded differently"
+    elif result["same_topic_similarity"] <= result["cross_topic_similarity"]:
+        result["reason"] = "Same-topic texts are not closer than cross-topic texts"
+    else:
+        result["passed"] = True
+        result["reason"] = "OK"
+    return result
+
+async def run_embed_benchmark(
+    embed: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+    batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+    input_words: Sequence[int] = DEFAULT_INPUT_WORDS,
+    repeats: int = DEFAULT_REPEATS
+) -> Dict[str, Any]:
+    """
+    Measure an embedding model's throughput over batch sizes and input lengths
+
+    A first call loads the model, so the measured batches exclude load time. Each
+    (input length, batch size) cell sends repeats batches of fresh texts one after
+    another; a final batch feeds the similarity check.
+
+    Args:
+        embed: Coroutine function embedding a list of texts and returning the response
+            dictionary (embeddings, prompt_eval_count, ...); may raise. A response
+            carrying wall_s (a replayed call) is timed by it instead of the clock
+        batch_sizes: Texts per request
+        input_words: Words per text
+        repeats: Batches per cell
+
+    Returns:
+        Dictionary with load_s, runs (per cell: words, batch_size, batches, errors,
+        error, latency_p50_s, latency_p95_s, vectors_per_s, tokens_per_s) and quality
+        (see similarity_check)
+    """
+    start = time.perf_counter()
+    resp = await embed(["warm-up"])
+    load_s = resp.get("wall_s", time.perf_counter() - start)
+
+    runs = []
+    for words in input_words:
+        for size in batch_sizes:
+            latencies: List[float] = []
+            tokens = 0
+            errors = 0
+            error: Optional[str] = None
+            for r in range(repeats):
+                texts = [text for _, text in make_inputs(size, words, seed=r + 1)]
+                t0 = time.perf_counter()
+                try:
+                    resp = await embed(texts)
+                except Exception as e:
+                    errors += 1
+                    error = str(e)
+                    continue
+                wall = resp.get("wall_s", time.perf_counter() - t0)
+                if len(resp.get("embeddings") or []) != size:
+                    errors += 1
+                    error = f"Got {len(resp.get('embeddings') or [])} vectors for {size} inputs"
+                    continue
+                latencies.append(wall)
+                tokens += resp.get("prompt_eval_count") or 0
+            busy = sum(latencies)
+            runs.append({
+                "words": words,
+                "batch_size": size,
+                "batches": len(latencies),
+                "errors": errors,
+                "error": error,
+                "latency_p50_s": percentile(latencies, 50),
+                "latency_p95_s": percentile(latencies, 95),
+                "vectors_per_s": size * len(latencies) / busy if busy else None,
+                "tokens_per_s": tokens / busy if busy and tokens else None,
+            })
+
+    labelled = make_inputs(QUALITY_INPUTS, QUALITY_WORDS, seed=0)
+    texts = [text for _, text in labelled] + [labelled[0][1]]
+    try:
+        resp = await embed(texts)
+        quality = similarity_check(resp.get("embeddings") or [], [topic for topic, _ in labelled])
+    except Exception as e:
+        quality = {"passed": False, "reason": f"Error: {e}"}
+    return {"load_s": load_s, "runs": runs, "quality": quality}
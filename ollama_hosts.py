@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_SLOTS = 1
+
+class OllamaHost:
+    """
+    One Ollama server of a host pool
+
+    Attributes:
+        url: Base URL of the server
+        slots: Number of jobs the host runs at once
+        models: Model name to digest of the models present on the host
+        configured: Models the config restricts the host to, or None for all
+    """
+
+    def __init__(self, url: str, slots: int = DEFAULT_SLOTS, models: Optional[Iterable[str]] = None):
+        self.url = url.rstrip("/")
+        self.slots = max(1, slots)
+        self.configured = list(models) if models is not None else None
+        self.models: Dict[str, Optional[str]] = dict.fromkeys(self.configured or [])
+        self.jobs = 0
+        self.stolen = 0
+        self.busy_s = 0.0
+
+    def has(self, models: Iterable[str]) -> bool:
+        return all(m in self.models for m in models)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"url": self.url, "slots": self.slots, "models": sorted(self.models),
+                "jobs": self.jobs, "stolen": self.stolen, "busy_s": self.busy_s}
+
+class HostPool:
+    """
+    Ollama servers sharing a test sweep
+
+    Jobs name the models they need. Each job is sharded to the least loaded host that
+    already has all of them, so no model is pulled or loaded on a second host just for
+    the sweep. Every host runs its queue with its own slots; a host whose queue runs dry
+    takes pending jobs from the back of the longest queue of another host, as long as it
+    has the models those jobs need.
+    """
+
+    def __init__(self, hosts: List[OllamaHost]):
+        if not hosts:
+            raise ValueError("A host pool needs at least one host")
+        self.hosts = hosts
+
+    @classmethod
+    def from_spec(cls, spec: str, slots: int = DEFAULT_SLOTS) -> "HostPool":
+        """
+        Build a pool from a JSON config file or a comma-separated list of URLs
+
+        The config file holds {"hosts": [{"url": ..., "slots": ..., "models": [...]}]};
+        slots and models are optional (models defaults to whatever the host has).
+
+        Args:
+            spec: Path of the config file, or URLs separated by commas
+            slots: Slots of hosts that do not set their own
+        """
+        if os.path.exists(spec):
+            with open(spec) as f:
+                config = json.load(f)
+            return cls([OllamaHost(h["url"], h.get("slots", slots), h.get("models"))
+                        for h in config["hosts"]])
+        return cls([OllamaHost(url.strip(), slots) for url in spec.split(",") if url.strip()])
+
+    def discover(self, list_models: Callable[[str], Dict[str, Optional[str]]]) -> List[str]:
+        """
+        Look up the models present on every host
+
+        Hosts with a configured model list keep only those models (with the digests the
+        host reports); a host that cannot be reached keeps its configured list, or has
+        no models.
+
+        Args:
+            list_models: Returns model name to digest for a host URL; may raise
+
+        Returns:
+            One message per host that could not be reached
+        """
+        errors = []
+        for host in self.hosts:
+            try:
+                found = list_models(host.url)
+            except Exception as e:
+                errors.append(f"{host.url}: {e}")
+                continue
+            if host.configured is None:
+                host.models = dict(found)
+            else:
+                host.models = {m: found.get(m) for m in host.configured if m in found}
+        return errors
+
+    def models(self) -> Dict[str, Optional[str]]:
+        """Every model in the pool with its digest, in host order (the first host's digest wins)"""
+        merged: Dict[str, Optional[str]] = {}
+        for host in self.hosts:
+            for m, digest in host.models.items():
+                if merged.get(m) is None:
+                    merged[m] = digest
+        return merged
+
+    def hosts_for(self, models: Iterable[str]) -> List[OllamaHost]:
+        models = list(models)
+        return [h for h in self.hosts if h.has(models)]
+
+    def shard(self, jobs: List[Tuple[Any, Tuple[str, ...]]]) -> Tuple[Dict[str, Deque], List[Any]]:
+        """
+        Assign jobs to hosts
+
+        Args:
+            jobs: (key, models needed) per job, in priority order
+
+        Returns:
+            Tuple of (host URL to queue of jobs, keys of jobs no host can run)
+        """
+        queues: Dict[str, Deque] = {h.url: deque() for h in self.hosts}
+        unplaced = []
+        for key, needed in jobs:
+            eligible = self.hosts_for(needed)
+            if not eligible:
+                unplaced.append(key)
+                continue
+            host = min(eligible, key=lambda h: len(queues[h.url]) / h.slots)
+            queues[host.url].append((key, needed))
+        return queues, unplaced
+
+    async def run(
+        self,
+        jobs: List[Tuple[Any, Tuple[str, ...]]],
+        worker: Callable[[OllamaHost, Any], Awaitable[Any]],
+        slot_context: Optional[Callable[[OllamaHost], Any]] = None
+    ) -> Tuple[Dict[Any, Any], List[Any]]:
+        """
+        Run jobs across the pool with work stealing
+
+        Args:
+            jobs: (key, models needed) per job, in priority order
+            worker: Coroutine function running one job on a host; an exception becomes
+                the job's result
+            slot_context: Returns an async context manager entered once per host slot
+                around all the jobs it runs (e.g. to open a client for the host)
+
+        Returns:
+            Tuple of (job key to result, keys of jobs no host can run)
+        """
+        queues, unplaced = self.shard(jobs)
+        results: Dict[Any, Any] = {}
+
+        def next_job(host: OllamaHost) -> Optional[Tuple[Any, Tuple[str, ...]]]:
+            if queues[host.url]:
+                return queues[host.url].popleft()
+            # Steal from the back of the busiest queue holding a job this host can run
+            for other in sorted(self.hosts, key=lambda h: len(queues[h.url]), reverse=True):
+                if other is host:
+                    continue
+                for i in range(len(queues[other.url]) - 1, -1, -1):
+                    if host.has(queues[other.url][i][1]):
+                        job = queues[other.url][i]
+                        del queues[other.url][i]
+                        host.stolen += 1
+                        return job
+            return None
+
+        async def slot(host: OllamaHost) -> None:
+            async def drain():
+                while True:
+                    job = next_job(host)
+                    if job is None:
+                        return
+                    key = job[0]
+                    start = time.perf_counter()
+                    try:
+                        results[key] = await worker(host, key)
+                    except Exception as e:
+                        results[key] = e
+                    host.jobs += 1
+                    host.busy_s += time.perf_counter() - start
+
+            if slot_context is None:
+                await drain()
+            else:
+                async with slot_context(host):
+                    await drain()
+
+        await asyncio.gather(*(slot(h) for h in self.hosts for _ in range(h.slots)))
+        return results, unplaced
+
+    def summary(self) -> List[Dict[str, Any]]:
+        return [h.summary() for h in self.hosts]
@@ -0,0 +1,123 @@
+import random
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+
+# Optional imports - will be checked at runtime
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# Connection pool and retry policy shared by every search backend
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+RETRIES = 2
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DEFAULT_TIMEOUT = 10
+
+# Shared sessions, with and without the retry policy
+_sessions: Dict[bool, "requests.Session"] = {}
+_session_lock = threading.Lock()
+
+def get_session(retry: bool = True) -> "requests.Session":
+    """
+    Get a process-wide keep-alive HTTP session, creating it on first use
+
+    The session keeps a pool of connections per host. With retry, it retries
+    idempotent requests on connection errors and 429/5xx responses with exponential
+    backoff, honouring Retry-After headers; without, every call is exactly one request,
+    as measurements of a backend's errors and latency need.
+
+    Args:
+        retry: Whether the session applies the retry policy
+
+    Returns:
+        The shared requests.Session
+    """
+    if not REQUESTS_AVAILABLE:
+        raise ImportError("requests package not installed")
+    with _session_lock:
+        if retry not in _sessions:
+            policy = Retry(
+                total=RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset(["GET", "HEAD"]),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            ) if retry else 0
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=policy)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[retry] = session
+        return _sessions[retry]
+
+def http_get(url: str, retry: bool = True, **kwargs: Any) -> "requests.Response":
+    """
+    GET a URL through a shared pooled session
+
+    Args:
+        url: URL to fetch
+        retry: Retry 429/5xx responses and connection errors (see get_session); False
+            sends exactly one request
+        kwargs: Extra arguments for requests.Session.get (timeout defaults to DEFAULT_TIMEOUT)
+
+    Returns:
+        The response
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session(retry).get(url, **kwargs)
+
+def make_async_client() -> "httpx.AsyncClient":
+    """
+    Create a keep-alive async HTTP client with the same pool size as the shared session
+
+    Returns:
+        A new httpx.AsyncClient; the caller owns it and must close it
+    """
+    limits = httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_CONNECTIONS)
+    # The transport retries failed connection attempts; status retries are in async_http_get
+    transport = httpx.AsyncHTTPTransport(retries=RETRIES, limits=limits)
+    return httpx.AsyncClient(transport=transport, timeout=DEFAULT_TIMEOUT)
+
+async def async_http_get(
+    client: "httpx.AsyncClient",
+    url: str,
+    headers: Optional[dict] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    retry: bool = True
+) -> "httpx.Response":
+    """
+    GET a URL with an async client, applying the shared retry policy to 429/5xx responses
+
+    Args:
+        client: Client created by make_async_client (or any httpx.AsyncClient)
+        url: URL to fetch
+        headers: Optional request headers
+        timeout: Request timeout in seconds
+        retry: Retry 429/5xx responses; False returns the first response
+
+    Returns:
+        The last response received
+    """
+    retries = RETRIES if retry else 0
+    for attempt in range(retries + 1):
+        r = await client.get(url, headers=headers, timeout=timeout)
+        if r.status_code not in RETRY_STATUSES or attempt == retries:
+            return r
+        retry_after = r.headers.get("Retry-After")
+        delay = float(retry_after) if retry_after and retry_after.isdigit() else BACKOFF_FACTOR * (2 ** attempt)
+        await asyncio.sleep(delay + random.uniform(0, BACKOFF_FACTOR / 2))
+    return r
@@ -0,0 +1,135 @@
+import json
+import time
+import argparse
+import resource
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, List, Tuple
+
+import requests
+
+from ollama_http import http_get
+from ollama_stats import percentile
+
+DEFAULT_URL = "https://api.duckduckgo.com/?q=population+of+Tokyo&format=json"
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Answers every GET with a small Instant Answer-shaped JSON body over keep-alive HTTP/1.1"""
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed ACKs stall keep-alive clients
+    disable_nagle_algorithm = True
+    body = json.dumps({"AbstractText": "Tokyo", "Results": [{"FirstURL": "https://example.com"}]}).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_local_server() -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start a local JSON endpoint on a free port
+
+    Returns:
+        Tuple of (server, URL to query)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _JSONHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/?q=population+of+Tokyo&format=json"
+
+def fetch_pooled(url: str) -> None:
+    r = http_get(url)
+    r.raise_for_status()
+    r.content
+
+def fetch_bare(url: str) -> None:
+    r = requests.get(url, timeout=10)
+    r.raise_for_status()
+    r.content
+
+def fetch_curl(url: str) -> None:
+    subprocess.check_output(["curl", "-s", "-f", url], timeout=15)
+
+TRANSPORTS: Dict[str, Callable[[str], None]] = {
+    "pooled session": fetch_pooled,
+    "bare requests.get": fetch_bare,
+    "curl subprocess": fetch_curl,
+}
+
+def _cpu_seconds() -> float:
+    """CPU time (user + system) of this process and its finished child processes"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def bench_transport(fetch: Callable[[str], None], url: str, queries: int, warmup: int = 1) -> Dict[str, float]:
+    """
+    Time a transport over a number of sequential queries
+
+    Args:
+        fetch: Function performing one GET of the URL
+        url: URL to query
+        queries: Number of timed queries
+        warmup: Untimed queries sent first (opens the pooled connection)
+
+    Returns:
+        Dictionary with p50/p95/mean latency, CPU time per query (ms) and error count
+    """
+    for _ in range(warmup):
+        try:
+            fetch(url)
+        except Exception:
+            pass
+
+    latencies: List[float] = []
+    errors = 0
+    cpu_start = _cpu_seconds()
+    for _ in range(queries):
+        start = time.perf_counter()
+        try:
+            fetch(url)
+        except Exception:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    cpu_ms = (_cpu_seconds() - cpu_start) * 1000
+
+    return {
+        "p50_ms": percentile(latencies, 50) or 0.0,
+        "p95_ms": percentile(latencies, 95) or 0.0,
+        "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "cpu_ms_per_query": cpu_ms / queries if queries else 0.0,
+        "errors": errors,
+    }
+
+def main():
+    """Compare per-query latency and CPU cost of the pooled client, bare requests and curl"""
+    parser = argparse.ArgumentParser(description="Benchmark HTTP transports used by the search backends")
+    parser.add_argument("--url", default=DEFAULT_URL, help="URL to query (default: DuckDuckGo Instant Answer API)")
+    parser.add_argument("--local", action="store_true", help="Query a local JSON endpoint instead of --url")
+    parser.add_argument("-n", "--queries", type=int, default=20, help="Timed queries per transport (default: 20)")
+    args = parser.parse_args()
+
+    url = args.url
+    server = None
+    if args.local:
+        server, url = start_local_server()
+
+    print(f"Benchmarking {args.queries} sequential queries to {url}\n")
+    print("| Transport | p50 (ms) | p95 (ms) | Mean (ms) | CPU per query (ms) | Errors |")
+    print("|-----------|----------|----------|-----------|--------------------|--------|")
+    for name, fetch in TRANSPORTS.items():
+        r = bench_transport(fetch, url, args.queries)
+        print(f"| {name} | {r['p50_ms']:.1f} | {r['p95_ms']:.1f} | {r['mean_ms']:.1f} "
+              f"| {r['cpu_ms_per_query']:.2f} | {r['errors']} |")
+
+    if server is not None:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
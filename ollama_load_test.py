@@ -0,0 +1,308 @@
+import time
+import asyncio
+import argparse
+import itertools
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ollama_tool_tester import (
+    logger, CALL_METRICS, PASS_KEEP_ALIVE, chat_context, run_async, async_log_and_chat,
+    run_agent_loop, search_tools, configure_search_cache, check_dependencies, write_report
+)
+from ollama_conversation import Conversation
+from ollama_tool_loop import STOP_ERROR, STOP_DEADLINE
+from ollama_search_cache import DEFAULT_CACHE_PATH
+from ollama_stats import percentile, fmt_value
+
+# A level whose throughput is less than this much above the previous level's is saturated
+SATURATION_GAIN = 1.10
+
+CHAT_PROMPTS = [
+    "Explain in two sentences why the sky is blue.",
+    "Give three tips for writing readable Python code.",
+    "Summarize the plot of Hamlet in one paragraph.",
+    "What are the main differences between TCP and UDP?",
+]
+
+TOOL_PROMPTS = [
+    "Search for the population of Tokyo in 2025.",
+    "Search for the height of Mount Everest.",
+    "Search for the capital of Australia.",
+    "Search for the boiling point of water at high altitude.",
+]
+
+async def chat_conversation(model_name: str, index: int) -> bool:
+    """
+    One single-turn chat
+
+    Returns:
+        Whether the conversation finished without errors
+    """
+    messages = [{"role": "user", "content": CHAT_PROMPTS[index % len(CHAT_PROMPTS)]}]
+    resp = await async_log_and_chat(model_name, messages, options={"temperature": 0.5})
+    return "error" not in resp
+
+async def tool_conversation(model_name: str, index: int) -> bool:
+    """
+    One tool-call conversation: a prompt with the search tool, the searches the model
+    asks for, and the final answer
+
+    Returns:
+        Whether the conversation finished without errors
+    """
+    conv = Conversation(model_name, "load")
+    conv.user(TOOL_PROMPTS[index % len(TOOL_PROMPTS)])
+    loop = await run_agent_loop(model_name, conv, search_tools(), max_turns=2)
+    return loop["stop"] not in (STOP_ERROR, STOP_DEADLINE)
+
+FLOWS: Dict[str, Callable[[str, int], Awaitable[bool]]] = {
+    "chat": chat_conversation,
+    "tool": tool_conversation,
+}
+
+async def _timed(flow: Callable[[str, int], Awaitable[bool]], model_name: str, index: int,
+                 outcomes: List[Dict[str, Any]]) -> None:
+    start = time.perf_counter()
+    try:
+        ok = await flow(model_name, index)
+    except Exception as e:
+        logger.error(f"Load test conversation {index} failed: {e}")
+        ok = False
+    outcomes.append({"ok": ok, "latency_s": time.perf_counter() - start})
+
+async def run_concurrency_level(
+    model_name: str,
+    flow: Callable[[str, int], Awaitable[bool]],
+    concurrency: int,
+    conversations: int
+) -> Dict[str, Any]:
+    """
+    Keep a fixed number of conversations in flight until a number of them have run
+
+    Args:
+        model_name: Model under test
+        flow: Conversation coroutine (see FLOWS)
+        concurrency: Number of conversations in flight at once
+        conversations: Total number of conversations at this level
+
+    Returns:
+        Level summary (see summarize_level)
+    """
+    label = f"concurrency {concurrency}"
+    outcomes: List[Dict[str, Any]] = []
+    counter = itertools.count()
+
+    async def worker():
+        while True:
+            i = next(counter)
+            if i >= conversations:
+                return
+            await _timed(flow, model_name, i, outcomes)
+
+    start = time.perf_counter()
+    with chat_context(test=f"load:{label}"):
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize_level(label, outcomes, time.perf_counter() - start)
+
+async def run_rate_level(
+    model_name: str,
+    flow: Callable[[str, int], Awaitable[bool]],
+    rate: float,
+    duration: float
+) -> Dict[str, Any]:
+    """
+    Start conversations at a fixed rate, however many are still in flight (open loop)
+
+    Args:
+        model_name: Model under test
+        flow: Conversation coroutine (see FLOWS)
+        rate: Conversations started per second
+        duration: Seconds during which new conversations are started
+
+    Returns:
+        Level summary (see summarize_level)
+    """
+    label = f"rate {rate:g}/s"
+    outcomes: List[Dict[str, Any]] = []
+    tasks = []
+    start = time.perf_counter()
+    with chat_context(test=f"load:{label}"):
+        for i in itertools.count():
+            due = start + i / rate
+            if due - start >= duration:
+                break
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            tasks.append(asyncio.create_task(_timed(flow, model_name, i, outcomes)))
+        await asyncio.gather(*tasks)
+    return summarize_level(label, outcomes, time.perf_counter() - start)
+
+def summarize_level(label: str, outcomes: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """
+    Combine conversation outcomes and the level's call metrics
+
+    Args:
+        label: Level name, also the test tag of its chat calls
+        outcomes: Per-conversation results from _timed
+        elapsed: Wall-clock duration of the level in seconds
+
+    Returns:
+        Dictionary with throughput, latency percentiles, TTFT and error rate
+    """
+    calls = [r for r in CALL_METRICS.snapshot() if r.get("test") == f"load:{label}"]
+    ok_calls = [r for r in calls if not r["error"]]
+    wall = [r["wall_s"] for r in ok_calls]
+    ttft = [r["ttft_s"] for r in ok_calls if r.get("ttft_s") is not None]
+    tokens = sum(r.get("eval_count") or 0 for r in ok_calls)
+    latencies = [o["latency_s"] for o in outcomes]
+    failed = sum(1 for o in outcomes if not o["ok"])
+    return {
+        "level": label,
+        "conversations": len(outcomes),
+        "calls": len(calls),
+        "error_rate": failed / len(outcomes) if outcomes else 0.0,
+        "conversations_per_s": len(outcomes) / elapsed if elapsed else 0.0,
+        "calls_per_s": len(calls) / elapsed if elapsed else 0.0,
+        "gen_tokens_per_s": tokens / elapsed if elapsed else 0.0,
+        "call_p50_s": percentile(wall, 50),
+        "call_p95_s": percentile(wall, 95),
+        "call_p99_s": percentile(wall, 99),
+        "conversation_p95_s": percentile(latencies, 95),
+        "ttft_p50_s": percentile(ttft, 50),
+        "ttft_p95_s": percentile(ttft, 95),
+    }
+
+def saturation_level(levels: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    The last level before throughput stopped growing
+
+    Returns:
+        Label of the saturated level, or None if throughput still grew at the last level
+    """
+    for prev, cur in zip(levels, levels[1:]):
+        if cur["conversations_per_s"] < prev["conversations_per_s"] * SATURATION_GAIN:
+            return prev["level"]
+    return None
+
+async def async_run_load_test(
+    model_name: str,
+    flow: str = "chat",
+    concurrency: Optional[List[int]] = None,
+    rates: Optional[List[float]] = None,
+    conversations: int = 32,
+    duration: float = 30.0,
+    warmup: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Drive one model with increasing load, one level after another
+
+    Args:
+        model_name: Model under test
+        flow: "chat" or "tool"
+        concurrency: Concurrency levels to run (closed loop)
+        rates: Conversation start rates to run (open loop); used instead of concurrency
+        conversations: Conversations per concurrency level
+        duration: Seconds per rate level
+        warmup: Run one untimed conversation first, so model loading is not measured
+
+    Returns:
+        One summary per level
+    """
+    conversation = FLOWS[flow]
+    if warmup:
+        with chat_context(test="load:warmup"):
+            await conversation(model_name, 0)
+
+    levels = []
+    if rates:
+        for rate in rates:
+            logger.info(f"Load test {model_name}: {rate:g} conversations/s for {duration:g}s")
+            levels.append(await run_rate_level(model_name, conversation, rate, duration))
+    else:
+        for n in concurrency or [1, 2, 4, 8]:
+            logger.info(f"Load test {model_name}: {conversations} conversations at concurrency {n}")
+            levels.append(await run_concurrency_level(model_name, conversation, n, conversations))
+    return levels
+
+def run_load_test(model_name: str, **kwargs: Any) -> List[Dict[str, Any]]:
+    """Synchronous wrapper around async_run_load_test"""
+    return run_async(async_run_load_test(model_name, **kwargs))
+
+def load_test_report(model_name: str, flow: str, levels: List[Dict[str, Any]]) -> str:
+    """
+    Render load test results as markdown
+
+    Args:
+        model_name: Model under test
+        flow: Conversation flow that was run
+        levels: Level summaries from run_load_test
+
+    Returns:
+        Markdown report
+    """
+    lines = [f"# Ollama Load Test: {model_name}",
+             f"Test Date: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+             f"Flow: {flow}\n",
+             "| Level | Conversations | Calls | Error Rate | Conv/s | Calls/s | Gen tok/s "
+             "| Call p50 (s) | Call p95 (s) | Call p99 (s) | Conv p95 (s) | TTFT p50 (s) | TTFT p95 (s) |",
+             "|-------|---------------|-------|------------|--------|---------|-----------"
+             "|--------------|--------------|--------------|--------------|--------------|--------------|"]
+    for lv in levels:
+        lines.append(
+            f"| {lv['level']} | {lv['conversations']} | {lv['calls']} | {lv['error_rate']:.1%} "
+            f"| {lv['conversations_per_s']:.2f} | {lv['calls_per_s']:.2f} | {lv['gen_tokens_per_s']:.1f} "
+            f"| {fmt_value(lv['call_p50_s'])} | {fmt_value(lv['call_p95_s'])} | {fmt_value(lv['call_p99_s'])} "
+            f"| {fmt_value(lv['conversation_p95_s'])} | {fmt_value(lv['ttft_p50_s'])} | {fmt_value(lv['ttft_p95_s'])} |"
+        )
+    saturated = saturation_level(levels)
+    lines.append("")
+    if saturated:
+        lines.append(f"Throughput stops growing after **{saturated}**; higher load only adds latency. "
+                     "Compare this with the server's OLLAMA_NUM_PARALLEL.")
+    else:
+        lines.append("Throughput still grew at the highest level tested.")
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None):
+    """Run a load test against one model and write a markdown report"""
+    parser = argparse.ArgumentParser(description="Load test one Ollama model with concurrent conversations")
+    parser.add_argument("model", help="Model to load test")
+    parser.add_argument("--flow", choices=list(FLOWS), default="chat",
+                        help="Single-turn chats or tool-call conversations (default: chat)")
+    parser.add_argument("--concurrency", default="1,2,4,8",
+                        help="Comma-separated concurrency levels (default: 1,2,4,8)")
+    parser.add_argument("--conversations", type=int, default=32,
+                        help="Conversations per concurrency level (default: 32)")
+    parser.add_argument("--rate", default=None,
+                        help="Comma-separated conversation start rates per second; replaces --concurrency")
+    parser.add_argument("--duration", type=float, default=30.0,
+                        help="Seconds per rate level (default: 30)")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Do not stream responses (time-to-first-token is then not measured)")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="Include model loading in the first level")
+    parser.add_argument("--keep-alive", default=PASS_KEEP_ALIVE,
+                        help=f"keep_alive sent with every call (default: {PASS_KEEP_ALIVE})")
+    args = parser.parse_args(argv)
+
+    if not check_dependencies():
+        logger.error("Missing required dependencies. Exiting.")
+        return
+    if args.flow == "tool":
+        configure_search_cache(DEFAULT_CACHE_PATH)
+
+    with chat_context(stream=not args.no_stream, keep_alive=args.keep_alive):
+        levels = run_load_test(
+            args.model,
+            flow=args.flow,
+            concurrency=[int(n) for n in args.concurrency.split(",")],
+            rates=[float(r) for r in args.rate.split(",")] if args.rate else None,
+            conversations=args.conversations,
+            duration=args.duration,
+            warmup=not args.no_warmup
+        )
+    write_report(load_test_report(args.model, args.flow, levels), prefix="ollama_loadtest")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nLoad test interrupted by user")
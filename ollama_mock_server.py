@@ -0,0 +1,335 @@
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+# Dimensions of the mock embedding vectors
+EMBED_DIMENSIONS = 64
+
+# Model specs: capabilities, family, parameter size and context length (default
+# MOCK_CONTEXT_LENGTH) as reported by /api/show, plus
+# optional per-model overrides of the server's scripting (see MockOllamaServer)
+DEFAULT_MODELS: Dict[str, Dict[str, Any]] = {
+    "mock-tools:8b": {"capabilities": ["completion", "tools"], "family": "llama", "parameter_size": "8.0B"},
+    "mock-tools:3b": {"capabilities": ["completion", "tools"], "family": "qwen2", "parameter_size": "3.1B"},
+    "mock-chat:7b": {"capabilities": ["completion"], "family": "gemma", "parameter_size": "7.0B"},
+    "mock-embed:latest": {"capabilities": ["embedding"], "family": "nomic-bert", "parameter_size": "137M"},
+}
+
+MOCK_CONTEXT_LENGTH = 8192
+
+TOOLS_TEMPLATE = "{{- if .Tools }}{{ .Tools }}{{ end }}{{ range .Messages }}{{ .Content }}{{ end }}"
+CHAT_TEMPLATE = "{{ range .Messages }}{{ .Content }}{{ end }}"
+
+def _ns(seconds: float) -> int:
+    return int(seconds * 1e9)
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Responses are written in several pieces; without this, delayed ACKs stall keep-alive clients
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def mock(self) -> "MockOllamaServer":
+        return self.server.mock
+
+    def _json(self, obj: Any, code: int = 200) -> None:
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.mock.count(url.path)
+        if url.path == "/api/tags":
+            return self._json({"models": [
+                {"name": name, "model": name, "digest": self.mock.digest(name), "size": 1,
+                 "details": {"family": spec.get("family"), "parameter_size": spec.get("parameter_size")}}
+                for name, spec in self.mock.models.items()
+            ]})
+        if url.path == "/api/version":
+            return self._json({"version": "0.0.0-mock"})
+        query = parse_qs(url.query).get("q", [""])[0]
+        time.sleep(self.mock.search_latency)
+        if url.path.startswith("/brave"):
+            return self._json({"results": [
+                {"title": f"{query} ({i})", "url": f"https://example.com/brave/{i}",
+                 "description": f"Brave stand-in result {i} for {query}"} for i in range(3)
+            ]})
+        if url.path.startswith("/ddg"):
+            return self._json({
+                "AbstractText": f"Stand-in abstract for {query}",
+                "Abstract": f"Stand-in abstract for {query}",
+                "Answer": f"Stand-in answer for {query}",
+                "Results": [{"FirstURL": f"https://example.com/ddg/{i}"} for i in range(2)],
+                "RelatedTopics": [{"FirstURL": f"https://example.com/topic/{i}", "Text": f"{query} topic {i}"}
+                                  for i in range(3)],
+                "Infobox": {"content": [{"label": "Query", "value": query}]},
+            })
+        self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        req = json.loads(self.rfile.read(length) or b"{}")
+        path = urlparse(self.path).path
+        self.mock.count(path)
+        model = req.get("model") or req.get("name")
+        if path in ("/api/show", "/api/chat", "/api/generate", "/api/embed") and model not in self.mock.models:
+            return self._json({"error": f"model '{model}' not found"}, 404)
+
+        if path == "/api/show":
+            return self._json(self.mock.show(model))
+        if path == "/api/generate":
+            return self._json({"model": model, "response": "", "done": True, "done_reason": "unload"})
+        if path == "/api/chat":
+            return self._chat(model, req)
+        if path == "/api/embed":
+            return self._embed(model, req)
+        self._json({"error": "not found"}, 404)
+
+    def _embed(self, model: str, req: Dict[str, Any]) -> None:
+        inputs = req.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        spec = self.mock.models[model]
+        if "embedding" not in spec.get("capabilities", []):
+            return self._json({"error": f"\"{model}\" does not support embeddings"}, 400)
+        if spec.get("error"):
+            return self._json({"error": spec["error"]}, 500)
+        words = sum(len(text.split()) for text in inputs)
+        latency = spec.get("latency", self.mock.latency) + spec.get("token_delay", self.mock.token_delay) * words
+        time.sleep(latency if inputs else 0)
+        self._json({"model": model, "embeddings": [self.mock.embed(text) for text in inputs],
+                    "total_duration": _ns(latency), "load_duration": 0, "prompt_eval_count": words})
+
+    def _chat(self, model: str, req: Dict[str, Any]) -> None:
+        messages = req.get("messages") or []
+        if not messages:
+            # keep_alive=0 with no messages unloads the model
+            return self._json({"model": model, "done": True, "done_reason": "unload",
+                               "message": {"role": "assistant", "content": ""}})
+        spec = self.mock.models[model]
+        if "completion" not in spec.get("capabilities", []):
+            return self._json({"error": f"\"{model}\" does not support chat"}, 400)
+        if spec.get("error"):
+            return self._json({"error": spec["error"]}, 500)
+
+        message = self.mock.reply(model, messages, req.get("tools") or [])
+        latency = spec.get("latency", self.mock.latency)
+        token_delay = spec.get("token_delay", self.mock.token_delay)
+        words = message["content"].split(" ") if message["content"] else []
+        eval_count = max(len(words), 1)
+        final = {
+            "model": model, "done": True, "done_reason": "stop",
+            "total_duration": _ns(latency + token_delay * eval_count), "load_duration": 0,
+            "prompt_eval_count": self.mock.prompt_eval(model, messages, req.get("tools") or [], message),
+            "prompt_eval_duration": max(_ns(latency), 1_000_000),
+            "eval_count": eval_count, "eval_duration": max(_ns(token_delay * eval_count), 1_000_000),
+        }
+        time.sleep(latency)
+
+        if req.get("stream", True) is False:
+            time.sleep(token_delay * eval_count)
+            return self._json({**final, "message": message})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(obj: Dict[str, Any]) -> None:
+            data = (json.dumps(obj) + "\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        try:
+            for word in words:
+                time.sleep(token_delay)
+                chunk({"model": model, "done": False, "message": {"role": "assistant", "content": word + " "}})
+            if message.get("tool_calls"):
+                chunk({"model": model, "done": False,
+                       "message": {"role": "assistant", "content": "", "tool_calls": message["tool_calls"]}})
+            chunk({**final, "message": {"role": "assistant", "content": ""}})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading early (tool call or token budget cutoff)
+            pass
+
+class MockOllamaServer:
+    """
+    Local stand-in for an Ollama server and the search APIs, for tests and benchmarks
+
+    Serves /api/tags, /api/show, /api/chat (streaming and not), /api/embed and
+    /api/generate, plus a DuckDuckGo Instant Answer stand-in under /ddg/ and a Brave
+    stand-in under /brave.
+
+    Chat replies are scripted per model spec:
+        capabilities   "tools" makes the model answer a prompt that offers tools with one
+                       call per tool; models without "completion" reject chat requests
+        tool_calls     explicit list of {"name", "arguments"} calls to return instead
+        reply          fixed answer content instead of the default one
+        latency        seconds before the first token (default: the server's latency)
+        token_delay    seconds between tokens (default: the server's token_delay)
+        error          return this error for every chat request
+
+    Once a conversation holds tool results, the model answers with text that repeats
+    the user's question and the tool results, which satisfies the harness's checks.
+
+    Embedding models (capability "embedding") return hashed bag-of-words vectors, so
+    texts sharing words embed close to each other; latency and token_delay (per input
+    word) apply to them as well.
+
+    Like a real server, each model keeps the last prompt and its reply cached, and
+    prompt_eval_count only counts the tokens (4 characters each) after the prefix a new
+    prompt shares with that cache.
+    """
+
+    def __init__(
+        self,
+        models: Optional[Dict[str, Dict[str, Any]]] = None,
+        latency: float = 0.0,
+        token_delay: float = 0.0,
+        search_latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.models = {name: dict(spec) for name, spec in (models or DEFAULT_MODELS).items()}
+        self.latency = latency
+        self.token_delay = token_delay
+        self.search_latency = search_latency
+        self.requests: Counter = Counter()
+        self._prompt_cache: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _MockHandler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def ddg_url(self) -> str:
+        return f"{self.url}/ddg/"
+
+    @property
+    def brave_url(self) -> str:
+        return f"{self.url}/brave"
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def count(self, path: str) -> None:
+        with self._lock:
+            self.requests[path] += 1
+
+    def digest(self, model: str) -> str:
+        spec = self.models[model]
+        return spec.get("digest") or hashlib.sha256(json.dumps([model, spec], sort_keys=True).encode()).hexdigest()
+
+    def show(self, model: str) -> Dict[str, Any]:
+        """/api/show response of a model"""
+        spec = self.models[model]
+        capabilities = spec.get("capabilities", ["completion"])
+        return {
+            "modelfile": f"FROM {model}",
+            "template": TOOLS_TEMPLATE if "tools" in capabilities else CHAT_TEMPLATE,
+            "details": {"family": spec.get("family"), "families": [spec.get("family")],
+                        "parameter_size": spec.get("parameter_size"), "quantization_level": "Q4_K_M"},
+            "model_info": {"general.architecture": spec.get("family"),
+                           f"{spec.get('family')}.context_length": spec.get("context_length", MOCK_CONTEXT_LENGTH)},
+            "capabilities": capabilities,
+        }
+
+    def prompt_eval(self, model: str, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]],
+                    reply: Dict[str, Any]) -> int:
+        """Prompt tokens to evaluate for a chat request, given the model's cached prompt"""
+        prompt = json.dumps(tools, sort_keys=True) + "".join(json.dumps(m, sort_keys=True) for m in messages)
+        with self._lock:
+            cached = self._prompt_cache.get(model, "")
+            self._prompt_cache[model] = prompt + json.dumps(reply, sort_keys=True)
+        shared = 0
+        for a, b in zip(prompt, cached):
+            if a != b:
+                break
+            shared += 1
+        return (len(prompt) - shared) // 4 + 1
+
+    def embed(self, text: str) -> List[float]:
+        """Hashed bag-of-words vector of a text"""
+        vector = [0.0] * EMBED_DIMENSIONS
+        for word in text.lower().split():
+            h = int(hashlib.md5(word.encode()).hexdigest(), 16)
+            vector[h % EMBED_DIMENSIONS] += 1.0 if (h >> 8) % 2 else -1.0
+        return vector
+
+    def reply(self, model: str, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Scripted assistant message for a chat request"""
+        spec = self.models[model]
+        question = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+        tool_results = [str(m.get("content", "")) for m in messages if m.get("role") == "tool"]
+
+        if tools and not tool_results and "tools" in spec.get("capabilities", []):
+            calls = spec.get("tool_calls")
+            if calls is None:
+                calls = []
+                for tool in tools:
+                    props = tool["function"].get("parameters", {}).get("properties", {})
+                    calls.append({"name": tool["function"]["name"], "arguments": {p: question for p in props}})
+            return {"role": "assistant", "content": "",
+                    "tool_calls": [{"function": {"name": c["name"], "arguments": c["arguments"]}} for c in calls]}
+
+        if spec.get("reply") is not None:
+            content = spec["reply"]
+        elif tool_results:
+            content = f"Based on the search results for {question}: {' '.join(tool_results)[:300]}"
+        else:
+            content = f"Answer to: {question}"
+        return {"role": "assistant", "content": content}
+
+def main():
+    """Run the mock server in the foreground"""
+    parser = argparse.ArgumentParser(description="Local stand-in for an Ollama server and the search APIs")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between tokens")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Seconds per search request")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(latency=args.latency, token_delay=args.token_delay,
+                              search_latency=args.search_latency, port=args.port).start()
+    print(f"Mock Ollama server on {server.url}")
+    print(f"  OLLAMA_HOST={server.url} DDG_API_URL={server.ddg_url} BRAVE_API_URL={server.brave_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MODEL_INFO_PATH = "ollama_model_info.json"
+
+# Test tracks a model can be routed to before any chat request is sent
+TRACK_TOOLS = "tools"        # full tool-calling tests
+TRACK_NO_TOOLS = "no_tools"  # straight to the alternative methods
+TRACK_EMBED = "embed"        # embedding model: embedding benchmark instead of chat tests
+TRACK_SKIP = "skip"          # cannot chat at all
+TRACK_UNKNOWN = "unknown"    # no metadata; run the tool test as before
+
+def summarize_show(show: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keep the parts of an /api/show response the pre-screen needs
+
+    Args:
+        show: /api/show response as a dictionary
+
+    Returns:
+        Dictionary with capabilities (None if the server does not report them), whether
+        the template mentions tools, family, parameter size and context length (trained
+        context window in tokens, None if not reported)
+    """
+    details = show.get("details") or {}
+    # Newer clients dump the field under its Python name
+    model_info = show.get("model_info") or show.get("modelinfo") or {}
+    return {
+        "capabilities": show.get("capabilities"),
+        "template_tools": ".Tools" in (show.get("template") or ""),
+        "family": details.get("family"),
+        "parameter_size": details.get("parameter_size"),
+        "context_length": next((v for k, v in model_info.items() if k.endswith(".context_length")), None),
+    }
+
+def screen_model(model_name: str, info: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    Decide which test track a model belongs on from its metadata
+
+    Servers that report capabilities are trusted directly; for older servers the chat
+    template (tool support needs .Tools) and the family are used instead.
+
+    Args:
+        model_name: Name of the model
+        info: Summary from summarize_show, or None if the metadata is unavailable
+
+    Returns:
+        Tuple of (track, reason)
+    """
+    if info is None:
+        return TRACK_UNKNOWN, "No model metadata"
+    caps = info.get("capabilities")
+    if caps is not None:
+        if "completion" not in caps:
+            if "embedding" in caps:
+                return TRACK_EMBED, "Embedding model"
+            return TRACK_SKIP, f"Does not support chat (capabilities: {', '.join(caps) or 'none'})"
+        if "tools" in caps:
+            return TRACK_TOOLS, "Reports tool support"
+        return TRACK_NO_TOOLS, "Does not report tool support"
+
+    family = (info.get("family") or "").lower()
+    if "bert" in family or "embed" in model_name.lower():
+        return TRACK_EMBED, f"Embedding model (family: {family or 'unknown'})"
+    if info.get("template_tools"):
+        return TRACK_TOOLS, "Template supports tools"
+    return TRACK_NO_TOOLS, "Template has no tool support"
+
+class ModelInfoCache:
+    """
+    Model metadata keyed by digest, kept in a JSON file across runs
+
+    A digest identifies one exact model build, so its metadata never changes and
+    entries need no expiry.
+    """
+
+    def __init__(self, path: str = DEFAULT_MODEL_INFO_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self._entries = json.load(f)
+
+    def get(self, digest: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not digest:
+            return None
+        with self._lock:
+            return self._entries.get(digest)
+
+    def put(self, digest: Optional[str], info: Dict[str, Any]) -> None:
+        """Store a model's metadata and rewrite the file"""
+        if not digest:
+            return
+        with self._lock:
+            self._entries[digest] = info
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp, self.path)
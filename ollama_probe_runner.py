@@ -0,0 +1,239 @@
+import json
+import time
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, TextIO
+
+# Optional imports - will be checked at runtime
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+from ollama_stats import percentile
+
+DEFAULT_REPEATS = 3
+DEFAULT_CONCURRENCY = 10
+# Seconds between monitoring rounds
+DEFAULT_INTERVAL = 60.0
+# Attempts per backend the rolling monitoring statistics are computed over
+DEFAULT_WINDOW = 30
+# Upper bounds (seconds) of the latency histogram buckets; slower attempts go in a last bucket
+HISTOGRAM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Error classes
+SKIPPED = "skipped"
+TIMEOUT = "timeout"
+CONNECTION = "connection"
+RATE_LIMITED = "rate_limited"
+HTTP_4XX = "http_4xx"
+HTTP_5XX = "http_5xx"
+BAD_RESPONSE = "bad_response"
+UNEXPECTED_CONTENT = "unexpected_content"
+
+class ProbeSkipped(Exception):
+    """A probe that cannot run here (e.g. a missing API key or package)"""
+
+class UnexpectedContent(Exception):
+    """A backend answered, but not with what a working backend returns"""
+
+def classify_error(error: Exception) -> str:
+    """
+    Sort a probe failure into an error class
+
+    Returns:
+        One of the error class constants, or the exception's type name
+    """
+    if isinstance(error, ProbeSkipped):
+        return SKIPPED
+    if isinstance(error, UnexpectedContent):
+        return UNEXPECTED_CONTENT
+    if isinstance(error, (TimeoutError, subprocess.TimeoutExpired)):
+        return TIMEOUT
+    if REQUESTS_AVAILABLE and isinstance(error, requests.Timeout):
+        return TIMEOUT
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return RATE_LIMITED
+    if status is not None:
+        return HTTP_4XX if status < 500 else HTTP_5XX
+    if isinstance(error, ConnectionError) or (REQUESTS_AVAILABLE and isinstance(error, requests.ConnectionError)):
+        return CONNECTION
+    if isinstance(error, ValueError):
+        return BAD_RESPONSE
+    return type(error).__name__
+
+def probe_once(probe: Callable[[], Any]) -> Dict[str, Any]:
+    """
+    Run a probe once; it fails by raising
+
+    Returns:
+        Dictionary with ok, latency_s, error_class and error
+    """
+    start = time.perf_counter()
+    try:
+        probe()
+        return {"ok": True, "latency_s": time.perf_counter() - start, "error_class": None, "error": None}
+    except Exception as e:
+        return {"ok": False, "latency_s": time.perf_counter() - start,
+                "error_class": classify_error(e), "error": str(e)}
+
+def latency_histogram(latencies: List[float]) -> List[int]:
+    """Counts of latencies per HISTOGRAM_BUCKETS bucket, plus one for slower values"""
+    counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+    for value in latencies:
+        counts[next((i for i, bound in enumerate(HISTOGRAM_BUCKETS) if value <= bound), len(HISTOGRAM_BUCKETS))] += 1
+    return counts
+
+def summarize_attempts(attempts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Statistics of a backend's attempts
+
+    Latencies are of successful attempts only; a failure often returns fast (or times
+    out) and says nothing about the backend's speed.
+
+    Returns:
+        Dictionary with attempts, successes, skipped, success_rate (of attempts that
+        were not skipped), p50_s, p95_s, mean_s, histogram and errors (count per class)
+    """
+    latencies = [a["latency_s"] for a in attempts if a["ok"]]
+    skipped = sum(1 for a in attempts if a["error_class"] == SKIPPED)
+    ran = len(attempts) - skipped
+    errors: Dict[str, int] = {}
+    for a in attempts:
+        if not a["ok"] and a["error_class"] != SKIPPED:
+            errors[a["error_class"]] = errors.get(a["error_class"], 0) + 1
+    return {
+        "attempts": len(attempts),
+        "successes": len(latencies),
+        "skipped": skipped,
+        "success_rate": len(latencies) / ran if ran else None,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "mean_s": sum(latencies) / len(latencies) if latencies else None,
+        "histogram": latency_histogram(latencies),
+        "errors": errors,
+    }
+
+def run_probes(
+    probes: Dict[str, Callable[[], Any]],
+    repeats: int = DEFAULT_REPEATS,
+    concurrency: int = DEFAULT_CONCURRENCY
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Probe every backend concurrently, repeating each probe
+
+    The repeats of one backend run one after another, so a backend is never hit by
+    several probes at once (which would trip its rate limit); different backends run in
+    parallel. A skipped probe is not repeated.
+
+    Args:
+        probes: Backend name to probe function
+        repeats: Attempts per backend
+        concurrency: Backends probed at once
+
+    Returns:
+        Backend name to its attempts (see probe_once)
+    """
+    def backend(probe: Callable[[], Any]) -> List[Dict[str, Any]]:
+        attempts = []
+        for _ in range(repeats):
+            attempts.append(probe_once(probe))
+            if attempts[-1]["error_class"] == SKIPPED:
+                break
+        return attempts
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(probes)))) as pool:
+        futures = {name: pool.submit(backend, probe) for name, probe in probes.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+def ranked(summaries: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Backend names, fastest working backend (by p50) first; backends without successes last"""
+    return sorted(summaries, key=lambda n: (summaries[n]["p50_s"] is None, summaries[n]["p50_s"] or 0.0))
+
+def format_summary(summaries: Dict[str, Dict[str, Any]]) -> str:
+    """Plain-text table of backend summaries, fastest first"""
+    lines = [f"{'Backend':<44} {'OK':>7} {'p50 (s)':>8} {'p95 (s)':>8}  Errors"]
+    for name in ranked(summaries):
+        s = summaries[name]
+        if s["skipped"] and not s["successes"] and not s["errors"]:
+            lines.append(f"{name:<44} {'SKIPPED':>7}")
+            continue
+        ok = f"{s['successes']}/{s['attempts'] - s['skipped']}"
+        p50 = "-" if s["p50_s"] is None else f"{s['p50_s']:.3f}"
+        p95 = "-" if s["p95_s"] is None else f"{s['p95_s']:.3f}"
+        errors = ", ".join(f"{cls}: {n}" for cls, n in sorted(s["errors"].items())) or "-"
+        lines.append(f"{name:<44} {ok:>7} {p50:>8} {p95:>8}  {errors}")
+    return "\n".join(lines)
+
+class BackendMonitor:
+    """Rolling window of the latest attempts per backend"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self.rounds = 0
+        self._attempts: Dict[str, Deque[Dict[str, Any]]] = {}
+
+    def add(self, results: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Add one round of run_probes results"""
+        self.rounds += 1
+        for name, attempts in results.items():
+            self._attempts.setdefault(name, deque(maxlen=self.window)).extend(attempts)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """summarize_attempts of each backend's window"""
+        return {name: summarize_attempts(list(attempts)) for name, attempts in self._attempts.items()}
+
+def run_monitor(
+    probes: Dict[str, Callable[[], Any]],
+    output: Optional[TextIO] = None,
+    interval: float = DEFAULT_INTERVAL,
+    window: int = DEFAULT_WINDOW,
+    repeats: int = 1,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rounds: Optional[int] = None,
+    on_round: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> BackendMonitor:
+    """
+    Probe the backends in rounds, keeping rolling statistics per backend
+
+    After every round one JSON line is written to output with the time, the round
+    number and, per backend, the rolling statistics plus those of the round itself
+    (under "round").
+
+    Args:
+        probes: Backend name to probe function
+        output: Text stream receiving the JSON lines (flushed after each)
+        interval: Seconds from the start of one round to the start of the next
+        window: Attempts per backend in the rolling statistics
+        repeats: Attempts per backend and round
+        concurrency: Backends probed at once
+        rounds: Stop after this many rounds (default: run until interrupted)
+        on_round: Called with each round's record
+
+    Returns:
+        The monitor holding the final rolling statistics
+    """
+    monitor = BackendMonitor(window)
+    while rounds is None or monitor.rounds < rounds:
+        start = time.monotonic()
+        results = run_probes(probes, repeats, concurrency)
+        monitor.add(results)
+        rolling = monitor.summary()
+        record = {
+            "time": time.time(),
+            "round": monitor.rounds,
+            "backends": {name: {**rolling[name], "round": summarize_attempts(attempts)}
+                         for name, attempts in results.items()},
+        }
+        if output is not None:
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+        if on_round is not None:
+            on_round(record)
+        if rounds is not None and monitor.rounds >= rounds:
+            break
+        time.sleep(max(0.0, interval - (time.monotonic() - start)))
+    return monitor
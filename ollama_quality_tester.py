@@ -1,140 +1,234 @@
-def test_brave_api():
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+# Optional imports - will be checked at runtime
+try:
+    from duckduckgo_search import DDGS
+    DDGS_AVAILABLE = True
+except ImportError:
+    DDGS_AVAILABLE = False
+
+from ollama_http import http_get
+from ollama_probe_runner import (ProbeSkipped, UnexpectedContent, run_probes, run_monitor, summarize_attempts,
+                                 format_summary, ranked, HISTOGRAM_BUCKETS, DEFAULT_REPEATS, DEFAULT_CONCURRENCY,
+                                 DEFAULT_INTERVAL, DEFAULT_WINDOW)
+
+# Each probe checks one search backend once: it returns if the backend works and raises otherwise.
+# Probes send exactly one request (retry=False), so 429/5xx responses are counted and retry
+# backoff does not end up in the latencies.
+
+def probe_duckduckgo_lite():
+    r = http_get("https://lite.duckduckgo.com/lite/", timeout=5, retry=False)
+    r.raise_for_status()
+
+def probe_duckduckgo_html():
+    r = http_get("https://html.duckduckgo.com/html/", timeout=5, retry=False)
+    r.raise_for_status()
+
+def probe_duckduckgo_api():
+    if not DDGS_AVAILABLE:
+        raise ProbeSkipped("duckduckgo_search package not installed")
+    with DDGS() as ddgs:
+        results = list(ddgs.text("test query", max_results=1))
+    if not results:
+        raise UnexpectedContent("No results")
+
+def probe_duckduckgo_api_curl():
+    """
+    Probe the DuckDuckGo Instant Answer API via the curl CLI.
+    """
+    # Using curl to call the Instant Answer API with recommended parameters
+    cmd = [
+        "curl", "-s", "-G", "https://api.duckduckgo.com",
+        "-H", "Accept: application/json",
+        "--data-urlencode", "q=python programming",
+        "--data-urlencode", "format=json",
+        "--data-urlencode", "no_html=1",
+        "--data-urlencode", "skip_disambig=1",
+        "--data-urlencode", "no_redirect=1"
+    ]
+    output = subprocess.check_output(cmd, timeout=30, stderr=subprocess.STDOUT).decode()
+    data = json.loads(output)
+    # Check for expected keys in the JSON response
+    if not ("AbstractText" in data or "RelatedTopics" in data or "Results" in data):
+        raise UnexpectedContent("Unexpected response structure")
+
+def probe_bing_api():
+    api_key = os.environ.get("BING_API_KEY")
+    if not api_key:
+        raise ProbeSkipped("Missing BING_API_KEY")
+    headers = {"Ocp-Apim-Subscription-Key": api_key}
+    params = {"q": "test query"}
+    r = http_get("https://api.bing.microsoft.com/v7.0/search", headers=headers, params=params, timeout=5,
+                 retry=False)
+    r.raise_for_status()
+
+def probe_google_serpapi():
+    api_key = os.environ.get("SERPAPI_API_KEY")
+    if not api_key:
+        raise ProbeSkipped("Missing SERPAPI_API_KEY")
+    params = {"q": "test query", "api_key": api_key, "engine": "google"}
+    r = http_get("https://serpapi.com/search", params=params, timeout=5, retry=False)
+    r.raise_for_status()
+
+def probe_qwant():
+    params = {"q": "test query", "t": "web", "count": 1}
+    r = http_get("https://api.qwant.com/api/search/web", params=params, timeout=5, retry=False)
+    r.raise_for_status()
+
+def probe_startpage():
+    r = http_get("https://www.startpage.com/sp/search", params={"query": "test query"}, timeout=5, retry=False)
+    if "startpage" not in r.text.lower():
+        raise UnexpectedContent("Unexpected content")
+
+def probe_brave_api():
     api_key = os.environ.get("BRAVE_API_KEY")
     if not api_key:
-        print("Brave Search API: SKIPPED - Missing BRAVE_API_KEY")
-        return
-    try:
-        headers = {"X-Subscription-Token": api_key}
-        params = {"q": "test query"}
-        r = requests.get("https://api.search.brave.com/res/v1/web/search", headers=headers, params=params, timeout=5)
-        r.raise_for_status()
-        print("Brave Search API: SUCCESS")
-    except Exception as e:
-        print(f"Brave Search API: FAILURE - {e}")
+        raise ProbeSkipped("Missing BRAVE_API_KEY")
+    headers = {"X-Subscription-Token": api_key}
+    params = {"q": "test query"}
+    r = http_get("https://api.search.brave.com/res/v1/web/search", headers=headers, params=params, timeout=5,
+                 retry=False)
+    r.raise_for_status()
 
-def test_yandex_html():
+def probe_yandex_html():
+    r = http_get("https://yandex.com/search/?text=test+query", timeout=5, retry=False)
+    r.raise_for_status()
+    if "yandex" not in r.text.lower():
+        raise UnexpectedContent("Unexpected content")
+
+PROBES: Dict[str, Callable[[], Any]] = {
+    "DuckDuckGo Lite": probe_duckduckgo_lite,
+    "DuckDuckGo HTML": probe_duckduckgo_html,
+    "DuckDuckGo Search API (duckduckgo_search)": probe_duckduckgo_api,
+    "DuckDuckGo API via curl": probe_duckduckgo_api_curl,
+    "Bing Search API": probe_bing_api,
+    "Google SerpAPI": probe_google_serpapi,
+    "Qwant Web Search": probe_qwant,
+    "Startpage Search": probe_startpage,
+    "Brave Search API": probe_brave_api,
+    "Yandex Search HTML": probe_yandex_html,
+}
+
+def _print_probe(name: str, probe: Callable[[], Any]) -> None:
+    """Run a probe once and print SUCCESS, SKIPPED or FAILURE"""
     try:
-        r = requests.get("https://yandex.com/search/?text=test+query", timeout=5)
-        r.raise_for_status()
-        if "yandex" in r.text.lower():
-            print("Yandex Search HTML: SUCCESS")
-        else:
-            print("Yandex Search HTML: FAILURE - Unexpected content")
+        probe()
+        print(f"{name}: SUCCESS")
+    except ProbeSkipped as e:
+        print(f"{name}: SKIPPED - {e}")
     except Exception as e:
-        print(f"Yandex Search HTML: FAILURE - {e}")
-import os
-import requests
-import subprocess
-import json
-from duckduckgo_search import DDGS
+        print(f"{name}: FAILURE - {e}")
 
 def test_duckduckgo_lite():
-    try:
-        r = requests.get("https://lite.duckduckgo.com/lite/", timeout=5)
-        r.raise_for_status()
-        print("DuckDuckGo Lite: SUCCESS")
-    except Exception as e:
-        print(f"DuckDuckGo Lite: FAILURE - {e}")
+    _print_probe("DuckDuckGo Lite", probe_duckduckgo_lite)
 
 def test_duckduckgo_html():
-    try:
-        r = requests.get("https://html.duckduckgo.com/html/", timeout=5)
-        r.raise_for_status()
-        print("DuckDuckGo HTML: SUCCESS")
-    except Exception as e:
-        print(f"DuckDuckGo HTML: FAILURE - {e}")
+    _print_probe("DuckDuckGo HTML", probe_duckduckgo_html)
 
 def test_duckduckgo_api():
-    try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text("test query", max_results=1))
-            if results:
-                print("DuckDuckGo Search API (duckduckgo_search): SUCCESS")
-            else:
-                print("DuckDuckGo Search API (duckduckgo_search): FAILURE - No results")
-    except Exception as e:
-        print(f"DuckDuckGo Search API (duckduckgo_search): FAILURE - {e}")
-
+    _print_probe("DuckDuckGo Search API (duckduckgo_search)", probe_duckduckgo_api)
 
 def test_duckduckgo_api_curl():
     """
     Test the DuckDuckGo Instant Answer API via the curl CLI.
     """
-    try:
-        # Using curl to call the Instant Answer API with recommended parameters
-        cmd = [
-            "curl", "-s", "-G", "https://api.duckduckgo.com",
-            "-H", "Accept: application/json",
-            "--data-urlencode", "q=python programming",
-            "--data-urlencode", "format=json",
-            "--data-urlencode", "no_html=1",
-            "--data-urlencode", "skip_disambig=1",
-            "--data-urlencode", "no_redirect=1"
-        ]
-        output = subprocess.check_output(cmd, timeout=30, stderr=subprocess.STDOUT).decode()
-        data = json.loads(output)
-        # Check for expected keys in the JSON response
-        if "AbstractText" in data or "RelatedTopics" in data or "Results" in data:
-            print("DuckDuckGo API via curl: SUCCESS")
-        else:
-            print("DuckDuckGo API via curl: FAILURE - Unexpected response structure")
-    except Exception as e:
-        print(f"DuckDuckGo API via curl: FAILURE - {e}")
+    _print_probe("DuckDuckGo API via curl", probe_duckduckgo_api_curl)
 
 def test_bing_api():
-    api_key = os.environ.get("BING_API_KEY")
-    if not api_key:
-        print("Bing Search API: SKIPPED - Missing BING_API_KEY")
-        return
-    try:
-        headers = {"Ocp-Apim-Subscription-Key": api_key}
-        params = {"q": "test query"}
-        r = requests.get("https://api.bing.microsoft.com/v7.0/search", headers=headers, params=params, timeout=5)
-        r.raise_for_status()
-        print("Bing Search API: SUCCESS")
-    except Exception as e:
-        print(f"Bing Search API: FAILURE - {e}")
+    _print_probe("Bing Search API", probe_bing_api)
 
 def test_google_serpapi():
-    api_key = os.environ.get("SERPAPI_API_KEY")
-    if not api_key:
-        print("Google SerpAPI: SKIPPED - Missing SERPAPI_API_KEY")
-        return
-    try:
-        params = {"q": "test query", "api_key": api_key, "engine": "google"}
-        r = requests.get("https://serpapi.com/search", params=params, timeout=5)
-        r.raise_for_status()
-        print("Google SerpAPI: SUCCESS")
-    except Exception as e:
-        print(f"Google SerpAPI: FAILURE - {e}")
+    _print_probe("Google SerpAPI", probe_google_serpapi)
 
 def test_qwant():
-    try:
-        params = {"q": "test query", "t": "web", "count": 1}
-        r = requests.get("https://api.qwant.com/api/search/web", params=params, timeout=5)
-        r.raise_for_status()
-        print("Qwant Web Search: SUCCESS")
-    except Exception as e:
-        print(f"Qwant Web Search: FAILURE - {e}")
+    _print_probe("Qwant Web Search", probe_qwant)
 
 def test_startpage():
-    try:
-        r = requests.get("https://www.startpage.com/sp/search", params={"query": "test query"}, timeout=5)
-        if "startpage" in r.text.lower():
-            print("Startpage Search: SUCCESS")
-        else:
-            print("Startpage Search: FAILURE - Unexpected content")
-    except Exception as e:
-        print(f"Startpage Search: FAILURE - {e}")
+    _print_probe("Startpage Search", probe_startpage)
+
+def test_brave_api():
+    _print_probe("Brave Search API", probe_brave_api)
+
+def test_yandex_html():
+    _print_probe("Yandex Search HTML", probe_yandex_html)
+
+def probe_backends(
+    repeats: int = DEFAULT_REPEATS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    backends: Optional[List[str]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Probe all search backends concurrently, several times each
+
+    Args:
+        repeats: Attempts per backend
+        concurrency: Backends probed at once
+        backends: Names of the backends to probe (default: all of PROBES)
+
+    Returns:
+        Backend name to summarize_attempts statistics (latencies, histogram, errors)
+    """
+    probes = {name: PROBES[name] for name in (backends or PROBES)}
+    return {name: summarize_attempts(attempts) for name, attempts in run_probes(probes, repeats, concurrency).items()}
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check which web search backends work, and how fast they are")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS,
+                        help="Attempts per backend (per round when monitoring)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Backends probed at once")
+    parser.add_argument("--backend", action="append", choices=list(PROBES), default=None,
+                        help="Probe only this backend (repeatable)")
+    parser.add_argument("--json", metavar="PATH", default=None,
+                        help="Write the results as JSON (JSON lines, one per round, when monitoring)")
+    parser.add_argument("--monitor", action="store_true",
+                        help="Probe continuously, keeping rolling p50/p95 per backend")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Seconds between monitoring rounds")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help="Attempts per backend in the rolling monitoring statistics")
+    parser.add_argument("--rounds", type=int, default=None,
+                        help="Stop monitoring after this many rounds")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Run each check once, one after another, printing SUCCESS or FAILURE")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.sequential:
+        for name in args.backend or PROBES:
+            _print_probe(name, PROBES[name])
+        return
+
+    probes = {name: PROBES[name] for name in (args.backend or PROBES)}
+    if args.monitor:
+        def show(record: Dict[str, Any]) -> None:
+            print(f"\nRound {record['round']} (rolling over the last {args.window} attempts per backend)")
+            print(format_summary(record["backends"]))
+
+        output = open(args.json, "a") if args.json else sys.stdout
+        try:
+            run_monitor(probes, output, args.interval, args.window, args.repeats, args.concurrency, args.rounds,
+                        on_round=show if args.json else None)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if args.json:
+                output.close()
+        return
+
+    summaries = probe_backends(args.repeats, args.concurrency, list(probes))
+    print(format_summary(summaries))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"repeats": args.repeats, "histogram_buckets_s": list(HISTOGRAM_BUCKETS),
+                       "ranking": ranked(summaries), "backends": summaries}, f, indent=2)
+        print(f"Results written to {args.json}")
 
 if __name__ == "__main__":
-    test_duckduckgo_lite()
-    test_duckduckgo_html()
-    test_duckduckgo_api()
-    test_duckduckgo_api_curl()
-    test_bing_api()
-    test_google_serpapi()
-    test_qwant()
-    test_startpage()
-    test_brave_api()
-    test_yandex_html()
+    main()
@@ -0,0 +1,373 @@
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+from ollama_stats import percentile
+
+DEFAULT_RESULTS_DB = "ollama_results.db"
+DEFAULT_HISTORY_RUNS = 30
+# A model's p95 wall time may grow this much over its baseline before it is flagged
+DEFAULT_LATENCY_TOLERANCE = 0.25
+# Fewer calls than this in either run make a latency comparison meaningless
+DEFAULT_MIN_CALLS = 3
+
+def _track_counts(track: str, data: Dict[str, Any]) -> tuple:
+    """(passed, total) of one model's results on a test track"""
+    if track in ("basic", "interface"):
+        return int(bool(data.get("success"))), 1
+    outcomes = [bool(r.get("success")) for r in data.values()]
+    return sum(outcomes), len(outcomes)
+
+class ResultsDB:
+    """
+    SQLite store of every run's per-model results and per-call timings
+
+    Tables:
+        runs     one row per run, with the report extras (residency, cache stats, ...)
+        results  one row per run, model and track (basic, advanced, alternative,
+                 interface), holding the result dictionary and its pass counts
+        calls    one row per chat call, holding the call metrics record
+
+    Results and calls are indexed by model and run, so history queries over the last
+    runs of a model only touch that model's rows.
+    """
+
+    def __init__(self, path: str = DEFAULT_RESULTS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " started REAL NOT NULL,"
+            " models TEXT NOT NULL,"
+            " extras TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS results ("
+            " run_id TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " track TEXT NOT NULL,"
+            " passed INTEGER NOT NULL,"
+            " total INTEGER NOT NULL,"
+            " data TEXT NOT NULL,"
+            " PRIMARY KEY (run_id, model, track));"
+            "CREATE TABLE IF NOT EXISTS calls ("
+            " run_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " model TEXT NOT NULL,"
+            " test TEXT,"
+            " wall_s REAL NOT NULL,"
+            " ttft_s REAL,"
+            " gen_tps REAL,"
+            " error INTEGER NOT NULL,"
+            " data TEXT NOT NULL,"
+            " PRIMARY KEY (run_id, seq));"
+            "CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started);"
+            "CREATE INDEX IF NOT EXISTS idx_results_model ON results (model, run_id);"
+            "CREATE INDEX IF NOT EXISTS idx_calls_model ON calls (model, run_id);"
+        )
+        self._conn.commit()
+
+    def store_run(
+        self,
+        run_id: str,
+        basic_results: Dict[str, Any],
+        advanced_results: Dict[str, Any],
+        alternative_results: Dict[str, Any],
+        interface_results: Dict[str, Any],
+        call_metrics: Optional[List[Dict[str, Any]]] = None,
+        started: Optional[float] = None,
+        **extras: Any
+    ) -> None:
+        """
+        Store a run, replacing any earlier copy of the same run (e.g. before a resume)
+
+        Args:
+            run_id: Identifier of the run
+            basic_results, advanced_results, alternative_results, interface_results:
+                Result dictionaries as passed to generate_report
+            call_metrics: Call metrics records of the run
+            started: Start time of the run (defaults to now)
+            extras: Further JSON-serializable generate_report arguments (residency, ...)
+        """
+        tracks = {"basic": basic_results, "advanced": advanced_results,
+                  "alternative": alternative_results, "interface": interface_results}
+        with self._lock, self._conn:
+            for table in ("runs", "results", "calls"):
+                self._conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+            self._conn.execute(
+                "INSERT INTO runs (run_id, started, models, extras) VALUES (?, ?, ?, ?)",
+                (run_id, started or time.time(), json.dumps(list(basic_results)), json.dumps(extras, default=str))
+            )
+            self._conn.executemany(
+                "INSERT INTO results (run_id, model, track, passed, total, data) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, model, track, *_track_counts(track, data), json.dumps(data, default=str))
+                 for track, results in tracks.items() for model, data in results.items()]
+            )
+            self._conn.executemany(
+                "INSERT INTO calls (run_id, seq, model, test, wall_s, ttft_s, gen_tps, error, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, seq, rec["model"], rec.get("test"), rec["wall_s"], rec.get("ttft_s"),
+                  rec.get("gen_tps"), int(bool(rec.get("error"))), json.dumps(rec, default=str))
+                 for seq, rec in enumerate(call_metrics or [])]
+            )
+
+    def runs(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Stored runs, most recent first
+
+        Args:
+            limit: Maximum number of runs to return
+
+        Returns:
+            List of dictionaries with run_id, started and models
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, started, models FROM runs ORDER BY started DESC LIMIT ?",
+                (-1 if limit is None else limit,)
+            ).fetchall()
+        return [{"run_id": r[0], "started": r[1], "models": json.loads(r[2])} for r in rows]
+
+    def latest_run(self) -> Optional[str]:
+        runs = self.runs(limit=1)
+        return runs[0]["run_id"] if runs else None
+
+    def report_inputs(self, run_id: str) -> Dict[str, Any]:
+        """
+        Load a stored run as keyword arguments for generate_report
+
+        Args:
+            run_id: Identifier of the run
+
+        Returns:
+            Dictionary with the four result dictionaries, call_metrics, test_date and
+            the stored extras
+        """
+        with self._lock:
+            run = self._conn.execute("SELECT started, models, extras FROM runs WHERE run_id = ?",
+                                     (run_id,)).fetchone()
+            if run is None:
+                raise KeyError(f"No stored run {run_id}")
+            results = self._conn.execute("SELECT model, track, data FROM results WHERE run_id = ?",
+                                         (run_id,)).fetchall()
+            calls = self._conn.execute("SELECT data FROM calls WHERE run_id = ? ORDER BY seq",
+                                       (run_id,)).fetchall()
+
+        tracks: Dict[str, Dict[str, Any]] = {t: {} for t in ("basic", "advanced", "alternative", "interface")}
+        by_model = {(model, track): json.loads(data) for model, track, data in results}
+        # Keep the run's model order, as the report lists models in sweep order
+        for model in json.loads(run[1]):
+            for track in tracks:
+                if (model, track) in by_model:
+                    tracks[track][model] = by_model[(model, track)]
+        return {
+            "basic_results": tracks["basic"],
+            "advanced_results": tracks["advanced"],
+            "alternative_results": tracks["alternative"],
+            "interface_results": tracks["interface"],
+            "call_metrics": [json.loads(c[0]) for c in calls],
+            "test_date": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run[0])),
+            **json.loads(run[2]),
+        }
+
+    def _model_runs(self, table: str, model: str, last_runs: int, before: Optional[str] = None) -> List[str]:
+        """The most recent runs (newest first) with rows for a model in a table"""
+        query = (f"SELECT r.run_id FROM runs r WHERE EXISTS"
+                 f" (SELECT 1 FROM {table} t WHERE t.model = ? AND t.run_id = r.run_id)")
+        params: List[Any] = [model]
+        if before is not None:
+            query += " AND r.started < (SELECT started FROM runs WHERE run_id = ?)"
+            params.append(before)
+        query += " ORDER BY r.started DESC LIMIT ?"
+        params.append(last_runs)
+        return [r[0] for r in self._conn.execute(query, params).fetchall()]
+
+    def call_latencies(
+        self,
+        model: str,
+        last_runs: int = DEFAULT_HISTORY_RUNS,
+        test: Optional[str] = None,
+        field: str = "wall_s"
+    ) -> List[float]:
+        """
+        Latencies of a model's successful calls over its last runs
+
+        Args:
+            model: Model name
+            last_runs: Number of most recent runs of the model to include
+            test: Only include calls made by this test
+            field: "wall_s" or "ttft_s"
+
+        Returns:
+            List of latencies in seconds
+        """
+        if field not in ("wall_s", "ttft_s"):
+            raise ValueError(f"Unknown latency field: {field}")
+        with self._lock:
+            run_ids = self._model_runs("calls", model, last_runs)
+            if not run_ids:
+                return []
+            query = (f"SELECT {field} FROM calls WHERE model = ? AND error = 0 AND {field} IS NOT NULL"
+                     f" AND run_id IN ({','.join('?' * len(run_ids))})")
+            params: List[Any] = [model, *run_ids]
+            if test is not None:
+                query += " AND test = ?"
+                params.append(test)
+            return [r[0] for r in self._conn.execute(query, params).fetchall()]
+
+    def latency_percentile(
+        self,
+        model: str,
+        pct: float = 95,
+        last_runs: int = DEFAULT_HISTORY_RUNS,
+        test: Optional[str] = None,
+        field: str = "wall_s"
+    ) -> Optional[float]:
+        """
+        Latency percentile of a model over its last runs, e.g. the p95 of llama3.1:8b
+        over the last 30 runs
+
+        Returns:
+            The percentile in seconds, or None without data
+        """
+        return percentile(self.call_latencies(model, last_runs, test, field), pct)
+
+    def pass_rate(self, model: str, run_id: str) -> Optional[float]:
+        """
+        Fraction of a model's test outcomes that passed in a run
+
+        Returns:
+            Pass rate between 0 and 1, or None if the model was not tested in the run
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT SUM(passed), SUM(total) FROM results WHERE model = ? AND run_id = ?", (model, run_id)
+            ).fetchone()
+        return row[0] / row[1] if row and row[1] else None
+
+    def model_history(self, model: str, last_runs: int = DEFAULT_HISTORY_RUNS) -> List[Dict[str, Any]]:
+        """
+        Per-run pass rate and wall-time percentiles of a model, most recent first
+
+        Returns:
+            List of dictionaries with run_id, pass_rate, calls, wall_p50_s and wall_p95_s
+        """
+        with self._lock:
+            run_ids = self._model_runs("results", model, last_runs)
+        history = []
+        for run_id in run_ids:
+            wall = self._run_latencies(model, run_id)
+            history.append({
+                "run_id": run_id,
+                "pass_rate": self.pass_rate(model, run_id),
+                "calls": len(wall),
+                "wall_p50_s": percentile(wall, 50),
+                "wall_p95_s": percentile(wall, 95),
+            })
+        return history
+
+    def _run_latencies(self, model: str, run_id: str) -> List[float]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT wall_s FROM calls WHERE model = ? AND run_id = ? AND error = 0", (model, run_id)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def regressions(
+        self,
+        run_id: str,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+        min_calls: int = DEFAULT_MIN_CALLS
+    ) -> List[Dict[str, Any]]:
+        """
+        Compare every model of a run against its baseline, the model's most recent
+        earlier run, and flag latency or pass-rate regressions
+
+        A latency regression is a p95 wall time more than latency_tolerance above the
+        baseline's (both runs need min_calls successful calls); a pass-rate regression
+        is any drop in the fraction of passed test outcomes.
+
+        Args:
+            run_id: Run to check
+            latency_tolerance: Allowed relative growth of the p95 wall time
+            min_calls: Minimum number of calls in both runs for a latency comparison
+
+        Returns:
+            List of dictionaries with model, metric, baseline_run, baseline and current
+        """
+        with self._lock:
+            models = [r[0] for r in self._conn.execute(
+                "SELECT DISTINCT model FROM results WHERE run_id = ?", (run_id,)
+            ).fetchall()]
+
+        flags = []
+        for model in models:
+            with self._lock:
+                previous = self._model_runs("results", model, 1, before=run_id)
+            if not previous:
+                continue
+            baseline_run = previous[0]
+
+            before, now = self.pass_rate(model, baseline_run), self.pass_rate(model, run_id)
+            if before is not None and now is not None and now < before:
+                flags.append({"model": model, "metric": "pass_rate", "baseline_run": baseline_run,
+                              "baseline": before, "current": now})
+
+            base_wall, wall = self._run_latencies(model, baseline_run), self._run_latencies(model, run_id)
+            if len(base_wall) >= min_calls and len(wall) >= min_calls:
+                before, now = percentile(base_wall, 95), percentile(wall, 95)
+                if now > before * (1 + latency_tolerance):
+                    flags.append({"model": model, "metric": "wall_p95_s", "baseline_run": baseline_run,
+                                  "baseline": before, "current": now})
+        return flags
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def main():
+    """Query the results database from the command line"""
+    parser = argparse.ArgumentParser(description="Query stored Ollama tool test results")
+    parser.add_argument("--db", default=DEFAULT_RESULTS_DB, help=f"Results database (default: {DEFAULT_RESULTS_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    runs = sub.add_parser("runs", help="List stored runs")
+    runs.add_argument("--limit", type=int, default=20)
+    latency = sub.add_parser("latency", help="Latency percentile of a model over its last runs")
+    latency.add_argument("model")
+    latency.add_argument("--pct", type=float, default=95)
+    latency.add_argument("--runs", type=int, default=DEFAULT_HISTORY_RUNS)
+    latency.add_argument("--test", default=None)
+    history = sub.add_parser("history", help="Per-run pass rate and latency of a model")
+    history.add_argument("model")
+    history.add_argument("--runs", type=int, default=DEFAULT_HISTORY_RUNS)
+    regressions = sub.add_parser("regressions", help="Regressions of a run against its baseline")
+    regressions.add_argument("run_id", nargs="?", default=None, help="Run to check (default: latest)")
+    args = parser.parse_args()
+
+    db = ResultsDB(args.db)
+    if args.command == "runs":
+        for run in db.runs(args.limit):
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["started"]))
+            print(f"{run['run_id']}  {started}  {len(run['models'])} models")
+    elif args.command == "latency":
+        value = db.latency_percentile(args.model, args.pct, args.runs, args.test)
+        print("no data" if value is None else f"{value:.3f}s")
+    elif args.command == "history":
+        for h in db.model_history(args.model, args.runs):
+            p95 = "-" if h["wall_p95_s"] is None else f"{h['wall_p95_s']:.3f}s"
+            print(f"{h['run_id']}  pass rate {h['pass_rate']:.0%}  calls {h['calls']}  p95 {p95}")
+    else:
+        run_id = args.run_id or db.latest_run()
+        flags = db.regressions(run_id) if run_id else []
+        for f in flags:
+            print(f"{f['model']}: {f['metric']} {f['baseline']:.3f} -> {f['current']:.3f} "
+                  f"(baseline run {f['baseline_run']})")
+        if not flags:
+            print("No regressions")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = "ollama_search_cache.db"
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a search query for use as a cache key
+
+    Args:
+        query: The search query
+
+    Returns:
+        Lower-cased query with runs of whitespace collapsed
+    """
+    return " ".join(query.lower().split())
+
+class SearchCache:
+    """
+    Persistent TTL/LRU cache of web search results, stored in SQLite
+
+    Entries are keyed on the search backend and the normalized query. Entries older
+    than the TTL are treated as misses, and once the cache holds more than max_entries
+    the least recently used ones are evicted.
+
+    Every entry read or written during the life of the cache object is also kept in
+    memory, so within one run every caller sees the same results for the same query,
+    even if the stored entry expires in the meantime.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._run_memo: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._evictions = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            " key TEXT PRIMARY KEY,"
+            " backend TEXT NOT NULL,"
+            " query TEXT NOT NULL,"
+            " results TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache (accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(backend: str, query: str) -> str:
+        return f"{backend}\x1f{normalize_query(query)}"
+
+    def _count(self, backend: str, field: str) -> None:
+        counts = self._stats.setdefault(backend, {"hits": 0, "misses": 0, "expired": 0, "stores": 0})
+        counts[field] += 1
+
+    def get(self, backend: str, query: str) -> Optional[Any]:
+        """
+        Look up cached results
+
+        Args:
+            backend: Name of the search backend
+            query: The search query
+
+        Returns:
+            The cached results, or None on a miss
+        """
+        key = self._key(backend, query)
+        now = time.time()
+        with self._lock:
+            if key in self._run_memo:
+                self._count(backend, "hits")
+                return self._run_memo[key]
+
+            row = self._conn.execute(
+                "SELECT results, created FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._count(backend, "misses")
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._count(backend, "expired")
+                self._count(backend, "misses")
+                return None
+
+            self._conn.execute("UPDATE search_cache SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            value = json.loads(row[0])
+            self._run_memo[key] = value
+            self._count(backend, "hits")
+            return value
+
+    def put(self, backend: str, query: str, results: Any) -> None:
+        """
+        Store results, evicting the least recently used entries beyond max_entries
+
+        Args:
+            backend: Name of the search backend
+            query: The search query
+            results: JSON-serializable search results
+        """
+        key = self._key(backend, query)
+        now = time.time()
+        with self._lock:
+            self._run_memo[key] = results
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, backend, query, results, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, backend, normalize_query(query), json.dumps(results), now, now)
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM search_cache WHERE key IN"
+                    " (SELECT key FROM search_cache ORDER BY accessed ASC LIMIT ?)", (excess,)
+                )
+                self._evictions += excess
+            self._conn.commit()
+            self._count(backend, "stores")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss statistics of this cache object
+
+        Returns:
+            Dictionary with per-backend counters, total hits and misses, the number of
+            evictions and the number of stored entries
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            backends = {b: dict(c) for b, c in self._stats.items()}
+        return {
+            "backends": backends,
+            "hits": sum(c["hits"] for c in backends.values()),
+            "misses": sum(c["misses"] for c in backends.values()),
+            "evictions": self._evictions,
+            "entries": entries,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,125 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from ollama_conversation import CHARS_PER_TOKEN, canonical_json
+
+# Prompt tokens the merged results of one search may take
+DEFAULT_RESULT_TOKENS = 400
+# Characters a snippet is cut to
+DEFAULT_SNIPPET_CHARS = 200
+
+# Query parameters that only track the click and do not change the page
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|ref|ref_src|fbclid|gclid|msclkid|yclid|mc_cid|mc_eid)$", re.I)
+_URL = re.compile(r"https?://\S+")
+
+def estimate_tokens(value: Any) -> int:
+    """Prompt tokens of a value sent as a tool result (its canonical JSON)"""
+    text = value if isinstance(value, str) else canonical_json(value)
+    return round(len(text) / CHARS_PER_TOKEN)
+
+def canonical_url(url: str) -> str:
+    """
+    Normalize a URL so that links to the same page compare equal
+
+    The scheme becomes https, the host is lowercased without "www.", default ports,
+    fragments, tracking parameters and trailing slashes are dropped and the remaining
+    query parameters are sorted. A malformed URL (bad port, broken IPv6 host) is
+    returned stripped but otherwise unchanged.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url.strip()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not _TRACKING_PARAMS.match(k)))
+    return urlunsplit(("https", host, parts.path.rstrip("/"), query, ""))
+
+def parse_result(text: str) -> Dict[str, Optional[str]]:
+    """
+    Split a search result string into title, url and snippet
+
+    Understands the formats of the search_web_* backends: "title - url - snippet",
+    "text - url", a bare URL, and URL-less facts such as "Abstract: ...".
+    """
+    match = _URL.search(text)
+    if match is None:
+        return {"title": None, "url": None, "snippet": text.strip()}
+    title = text[:match.start()].strip().rstrip("-").strip() or None
+    snippet = text[match.end():].strip().lstrip("-").strip() or None
+    return {"title": title, "url": match.group(0), "snippet": snippet}
+
+def _shorten(text: Optional[str], limit: int) -> Optional[str]:
+    if text is None or len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0]
+    return f"{cut}..."
+
+def _format(entry: Dict[str, Any], snippet_chars: int) -> str:
+    parts = [entry["title"], entry["url"], _shorten(entry["snippet"], snippet_chars)]
+    return " - ".join(p for p in parts if p)
+
+def merge_results(
+    results: Union[List[str], Dict[str, List[str]]],
+    token_budget: Optional[int] = DEFAULT_RESULT_TOKENS,
+    snippet_chars: int = DEFAULT_SNIPPET_CHARS
+) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Deduplicate, rank and trim search results before they are sent to a model
+
+    Results with the same canonical URL (or, without a URL, the same text) are merged,
+    keeping the longest title and snippet. Results returned by more backends rank
+    first, then those ranked higher by their backends. Snippets are cut to
+    snippet_chars and results are kept in rank order while they fit the token budget
+    (the first one always does).
+
+    Args:
+        results: One backend's results, or backend name to results (composite search);
+            failure markers should be removed beforehand
+        token_budget: Tokens the merged results may take (None for no limit)
+        snippet_chars: Characters a snippet is cut to
+
+    Returns:
+        Tuple of (merged results in the "title - url - snippet" format, stats with
+        raw_items, merged_items, duplicates, raw_tokens and merged_tokens)
+    """
+    lists = results if isinstance(results, dict) else {"": results}
+    merged: Dict[str, Dict[str, Any]] = {}
+    raw_items = 0
+    for backend, items in lists.items():
+        for position, text in enumerate(items):
+            raw_items += 1
+            if not text.strip():
+                continue
+            entry = parse_result(text)
+            key = canonical_url(entry["url"]) if entry["url"] else " ".join(entry["snippet"].lower().split())
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = {**entry, "backends": {backend}, "position": position}
+                continue
+            existing["backends"].add(backend)
+            existing["position"] = min(existing["position"], position)
+            for field in ("title", "snippet"):
+                if len(entry[field] or "") > len(existing[field] or ""):
+                    existing[field] = entry[field]
+
+    ranked = sorted(merged.values(), key=lambda e: (-len(e["backends"]), e["position"]))
+    out: List[str] = []
+    for entry in ranked:
+        text = _format(entry, snippet_chars)
+        if out and token_budget is not None and estimate_tokens(out + [text]) > token_budget:
+            break
+        out.append(text)
+    return out, {
+        "raw_items": raw_items,
+        "merged_items": len(out),
+        "duplicates": raw_items - len(merged),
+        "raw_tokens": estimate_tokens(results),
+        "merged_tokens": estimate_tokens(out),
+    }
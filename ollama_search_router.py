@@ -0,0 +1,199 @@
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+# Consecutive failures that open a backend's circuit
+DEFAULT_FAILURE_THRESHOLD = 3
+# Seconds an open circuit waits before letting a probe request through
+DEFAULT_COOLDOWN = 60.0
+# Requests let through at once while a circuit is half-open
+DEFAULT_HALF_OPEN_PROBES = 1
+# Weight of the newest call in the latency and success moving averages
+DEFAULT_ALPHA = 0.3
+# State transitions kept for the report
+MAX_TRANSITIONS = 100
+
+CLOSED = "closed"        # requests flow normally
+OPEN = "open"            # requests are skipped until the cooldown has passed
+HALF_OPEN = "half_open"  # a few probe requests decide whether to close or reopen
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one search backend
+
+    After failure_threshold consecutive failures the circuit opens and every request
+    is refused without being sent. Once cooldown seconds have passed it turns
+    half-open and lets half_open_probes requests through: a success closes it, a
+    failure opens it again for another cooldown.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, cooldown: float = DEFAULT_COOLDOWN,
+                 half_open_probes: int = DEFAULT_HALF_OPEN_PROBES):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probes = 0
+
+    def available(self, now: float) -> bool:
+        """Whether a request could be let through now, without reserving it"""
+        if self.state == OPEN:
+            return now - self.opened_at >= self.cooldown
+        if self.state == HALF_OPEN:
+            return self._probes < self.half_open_probes
+        return True
+
+    def allow(self, now: float) -> bool:
+        """Let a request through (reserving a probe slot when half-open) or refuse it"""
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self._probes = 0
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                return False
+            self._probes += 1
+            return True
+        return self.state == CLOSED
+
+    def record(self, success: bool, now: float) -> None:
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+        if success:
+            self.failures = 0
+            self.state = CLOSED
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.trips += 1
+            self.state = OPEN
+            self.opened_at = now
+
+    def release(self) -> None:
+        """Give back a probe slot of a request abandoned without an outcome"""
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+class SearchRouter:
+    """
+    Routes search traffic by each backend's recent latency and success rate
+
+    Every backend gets a CircuitBreaker, so a rate-limited or dead backend is skipped
+    at once instead of being waited on. Among the backends that may be called, order()
+    puts first the one with the lowest expected cost: its latency moving average
+    divided by its success moving average. Backends without measurements keep their
+    given order ahead of measured ones, so each gets measured.
+
+    Thread-safe; backends are created on first use.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown: float = DEFAULT_COOLDOWN,
+        half_open_probes: int = DEFAULT_HALF_OPEN_PROBES,
+        alpha: float = DEFAULT_ALPHA,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.half_open_probes = half_open_probes
+        self.alpha = alpha
+        self.clock = clock
+        self._start = clock()
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._transitions: Deque[Dict[str, Any]] = deque(maxlen=MAX_TRANSITIONS)
+
+    def _backend(self, name: str) -> CircuitBreaker:
+        if name not in self._breakers:
+            self._breakers[name] = CircuitBreaker(self.failure_threshold, self.cooldown, self.half_open_probes)
+            self._stats[name] = {"calls": 0, "successes": 0, "failures": 0, "skipped": 0,
+                                 "latency_s": None, "success": None, "last_error": None}
+        return self._breakers[name]
+
+    def _transition(self, name: str, before: str, after: str, now: float) -> None:
+        if before != after:
+            self._transitions.append({"t": now - self._start, "backend": name, "from": before, "to": after})
+
+    def order(self, backends: List[str]) -> List[str]:
+        """Backends whose circuit lets requests through, cheapest first; the others count as skipped"""
+        with self._lock:
+            now = self.clock()
+            usable = []
+            for b in backends:
+                if self._backend(b).available(now):
+                    usable.append(b)
+                else:
+                    self._stats[b]["skipped"] += 1
+
+            def cost(b: str) -> float:
+                stats = self._stats[b]
+                if stats["latency_s"] is None:
+                    return 0.0
+                return stats["latency_s"] / max(stats["success"], 0.05)
+            return sorted(usable, key=cost)
+
+    def allow(self, backend: str) -> bool:
+        """
+        Decide whether to call a backend now
+
+        A True answer must be followed by record() or release().
+        """
+        with self._lock:
+            now = self.clock()
+            breaker = self._backend(backend)
+            before = breaker.state
+            allowed = breaker.allow(now)
+            self._transition(backend, before, breaker.state, now)
+            if not allowed:
+                self._stats[backend]["skipped"] += 1
+            return allowed
+
+    def record(self, backend: str, success: bool, latency_s: float, error: Optional[str] = None) -> None:
+        """Record the outcome of a call let through by allow()"""
+        with self._lock:
+            now = self.clock()
+            breaker = self._backend(backend)
+            before = breaker.state
+            breaker.record(success, now)
+            self._transition(backend, before, breaker.state, now)
+            stats = self._stats[backend]
+            stats["calls"] += 1
+            stats["successes" if success else "failures"] += 1
+            if not success:
+                stats["last_error"] = error
+            a = self.alpha
+            stats["latency_s"] = latency_s if stats["latency_s"] is None else a * latency_s + (1 - a) * stats["latency_s"]
+            outcome = 1.0 if success else 0.0
+            stats["success"] = outcome if stats["success"] is None else a * outcome + (1 - a) * stats["success"]
+
+    def release(self, backend: str) -> None:
+        """Forget a call let through by allow() that was abandoned (e.g. cancelled)"""
+        with self._lock:
+            self._backend(backend).release()
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Router state for reports
+
+        Returns:
+            Dictionary with settings (failure_threshold, cooldown_s), backends (per
+            backend: name, state, calls, successes, failures, skipped, trips,
+            latency_s and success moving averages, last_error) and transitions (t
+            seconds since the router started, backend, from, to)
+        """
+        with self._lock:
+            return {
+                "failure_threshold": self.failure_threshold,
+                "cooldown_s": self.cooldown,
+                "backends": [{"name": name, "state": self._breakers[name].state,
+                              "trips": self._breakers[name].trips, **stats}
+                             for name, stats in self._stats.items()],
+                "transitions": list(self._transitions),
+            }
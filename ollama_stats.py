@@ -0,0 +1,24 @@
+from typing import List, Optional
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    Percentile of a list of values using linear interpolation between closest ranks
+
+    Args:
+        values: Sample values
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or None for an empty list
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * pct / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+def fmt_value(value: Optional[float], digits: int = 2) -> str:
+    """A number for a report table cell: "-" for None, else fixed-point with digits decimals"""
+    return "-" if value is None else f"{value:.{digits}f}"
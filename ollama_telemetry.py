@@ -0,0 +1,230 @@
+import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+DEFAULT_INTERVAL = 0.25
+# Process names (from /proc/<pid>/comm) of the Ollama server and its model runners
+PROCESS_NAMES = ("ollama", "ollama_llama_server")
+
+_MB = 2**20
+
+def telemetry_available() -> bool:
+    """Whether /proc can be read (Linux)"""
+    return os.path.exists("/proc/meminfo") and hasattr(os, "sysconf")
+
+def find_server_pids(names=PROCESS_NAMES) -> List[int]:
+    """PIDs of every running process whose name is one of names"""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/comm") as f:
+                if f.read().strip() in names:
+                    pids.append(int(entry))
+        except OSError:
+            continue
+    return pids
+
+def read_process(pid: int) -> Optional[tuple]:
+    """(CPU seconds, resident bytes) of a process, or None once it has exited"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces; the fields after it are fixed
+    fields = stat[stat.rindex(")") + 2:].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return cpu, int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+
+def read_meminfo() -> Dict[str, int]:
+    """System memory counters from /proc/meminfo, in bytes"""
+    info = {}
+    with open("/proc/meminfo") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            info[key] = int(value.split()[0]) * 1024
+    return info
+
+class _Usage:
+    """Samples taken during one tracked call (see ResourceSampler.track)"""
+
+    def __init__(self, first: Dict[str, Any], min_span: float):
+        self.samples = [first]
+        self.min_span = min_span
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        """
+        Resource usage of the server during the call
+
+        Returns:
+            Dictionary with samples, sampled_s, cpu_s (server CPU seconds used),
+            cpu_mean_pct, cpu_peak_pct (over the busiest span of at least half an
+            interval; None for shorter calls), rss_mean_mb, rss_peak_mb,
+            mem_available_min_mb and swap_used_peak_mb; None before the call ended
+        """
+        samples = self.samples
+        if len(samples) < 2:
+            return None
+        first, last = samples[0], samples[-1]
+        elapsed = last["t"] - first["t"]
+        cpu = max(0.0, last["cpu_s"] - first["cpu_s"])
+        # CPU time is counted in clock ticks, so rates over very short spans are noise
+        peaks = []
+        anchor = first
+        for s in samples[1:]:
+            if s["t"] - anchor["t"] >= self.min_span:
+                peaks.append(max(0.0, s["cpu_s"] - anchor["cpu_s"]) / (s["t"] - anchor["t"]))
+                anchor = s
+        rss = [s["rss"] for s in samples if s["rss"] is not None]
+        return {
+            "samples": len(samples),
+            "sampled_s": elapsed,
+            "cpu_s": cpu,
+            "cpu_mean_pct": cpu / elapsed * 100 if elapsed > 0 else None,
+            "cpu_peak_pct": max(peaks) * 100 if peaks else None,
+            "rss_mean_mb": sum(rss) / len(rss) / _MB if rss else None,
+            "rss_peak_mb": max(rss) / _MB if rss else None,
+            "mem_available_min_mb": min(s["mem_available"] for s in samples) / _MB,
+            "swap_used_peak_mb": max(s["swap_used"] for s in samples) / _MB,
+        }
+
+class ResourceSampler:
+    """
+    Samples the Ollama server's CPU and memory from /proc while chat calls are running
+
+    A background thread takes a sample every interval while at least one call is being
+    tracked, and adds it to every tracked call; concurrent calls to the same server
+    therefore share their samples. Each call is also sampled when it starts and ends,
+    so its CPU time is complete even when it is shorter than the interval.
+
+    The server processes are found by name on every sample, so model runners started
+    during a call are included. Only processes on this machine can be seen.
+
+    The /proc scan of a sample runs without holding any lock shared with the
+    background thread, so a call never waits for the thread's sample; async_track()
+    also moves its own samples off the event loop.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, pids: Optional[List[int]] = None,
+                 names=PROCESS_NAMES):
+        if interval <= 0:
+            raise ValueError("Sampling interval must be positive")
+        self.interval = interval
+        self.pids = pids
+        self.names = names
+        self._cond = threading.Condition()
+        self._active: List[_Usage] = []
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        # CPU accounting, shared by concurrent samples
+        self._cpu_lock = threading.Lock()
+        self._last_cpu: Dict[int, float] = {}
+        self._last_scan = 0.0
+        self._cpu_total = 0.0
+
+    def sample(self) -> Dict[str, Any]:
+        """
+        Take one sample
+
+        CPU time is accumulated per process, so processes exiting between samples do
+        not make it go backwards. Samples may run concurrently: a scan that started
+        before the last one applied only adds CPU time of processes still known.
+
+        Returns:
+            Dictionary with t, cpu_s (cumulative server CPU seconds), rss (bytes, None
+            if no server process was found), mem_available and swap_used (bytes)
+        """
+        scan = time.perf_counter()
+        rss = None
+        current = {}
+        for pid in self.pids or find_server_pids(self.names):
+            proc = read_process(pid)
+            if proc is None:
+                continue
+            cpu, resident = proc
+            current[pid] = cpu
+            rss = (rss or 0) + resident
+        mem = read_meminfo()
+
+        with self._cpu_lock:
+            latest = scan >= self._last_scan
+            for pid, cpu in current.items():
+                # An older scan must not bring back a process a newer one saw exit
+                if not latest and pid not in self._last_cpu:
+                    continue
+                # A process seen for the first time (a new model runner) counts in full
+                last = self._last_cpu.get(pid, 0.0)
+                self._cpu_total += max(0.0, cpu - last)
+                self._last_cpu[pid] = max(cpu, last)
+            if latest:
+                self._last_scan = scan
+                for pid in set(self._last_cpu) - set(current):
+                    del self._last_cpu[pid]
+            cpu_total = self._cpu_total
+        return {
+            "t": time.perf_counter(),
+            "cpu_s": cpu_total,
+            "rss": rss,
+            "mem_available": mem.get("MemAvailable", mem.get("MemFree", 0)),
+            "swap_used": mem.get("SwapTotal", 0) - mem.get("SwapFree", 0),
+        }
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._active and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            snapshot = self.sample()
+            with self._cond:
+                for usage in self._active:
+                    # Skip calls that started (and took their first sample) after this one
+                    if snapshot["t"] > usage.samples[-1]["t"]:
+                        usage.samples.append(snapshot)
+                self._cond.wait(self.interval)
+
+    def _begin(self, first: Dict[str, Any]) -> _Usage:
+        usage = _Usage(first, self.interval / 2)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+                self._thread.start()
+            self._active.append(usage)
+            self._cond.notify_all()
+        return usage
+
+    def _end(self, usage: _Usage) -> None:
+        with self._cond:
+            self._active.remove(usage)
+
+    @contextmanager
+    def track(self) -> Iterator[_Usage]:
+        """Sample the server for the duration of the block; the yielded usage's summary() holds the result"""
+        usage = self._begin(self.sample())
+        try:
+            yield usage
+        finally:
+            self._end(usage)
+            usage.samples.append(self.sample())
+
+    @asynccontextmanager
+    async def async_track(self) -> AsyncIterator[_Usage]:
+        """track() for coroutines: the start and end samples run in the default executor"""
+        loop = asyncio.get_running_loop()
+        usage = self._begin(await loop.run_in_executor(None, self.sample))
+        try:
+            yield usage
+        finally:
+            self._end(usage)
+            usage.samples.append(await loop.run_in_executor(None, self.sample))
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
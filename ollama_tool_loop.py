@@ -0,0 +1,213 @@
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ollama_conversation import Conversation
+
+DEFAULT_MAX_TURNS = 4
+# Seconds a whole tool loop (model calls and tool calls) may take
+DEFAULT_TIME_BUDGET = 300.0
+
+# Why a tool loop stopped
+STOP_ANSWER = "answer"        # the model answered without calling a tool
+STOP_MAX_TURNS = "max_turns"  # the last allowed turn still asked for tools
+STOP_DEADLINE = "deadline"    # the time budget ran out
+STOP_ERROR = "error"          # a chat call failed
+
+# Appended before the last turn of a loop, whose tool calls would not be run
+FINAL_ANSWER_PROMPT = "Answer now from the tool results above; no further tools will be run."
+
+class ToolRegistry:
+    """
+    Tools a model may call, with their schemas and implementations
+
+    Tool functions are coroutines called with the model's arguments as keyword
+    arguments. Their result becomes the content of the tool message (non-string
+    results are serialized as JSON); an exception or an unknown tool becomes an
+    "Error: ..." result instead of ending the loop.
+    """
+
+    def __init__(self):
+        self._tools: Dict[str, Dict[str, Any]] = {}
+
+    def register(
+        self,
+        name: str,
+        fn: Callable[..., Awaitable[Any]],
+        description: str,
+        properties: Dict[str, Dict[str, Any]],
+        required: Optional[List[str]] = None,
+        sequential: bool = False
+    ) -> "ToolRegistry":
+        """
+        Add a tool
+
+        Args:
+            name: Name the model calls the tool by
+            fn: Coroutine function implementing the tool
+            description: Description shown to the model
+            properties: JSON schema of each argument
+            required: Required arguments (default: all)
+            sequential: Run after the turn's other tool calls have finished, for tools
+                that use their results
+        """
+        self._tools[name] = {
+            "fn": fn,
+            "sequential": sequential,
+            "schema": {
+                "type": "function", "function": {
+                    "name": name,
+                    "description": description,
+                    "parameters": {
+                        "type": "object",
+                        "properties": properties,
+                        "required": list(properties) if required is None else required
+                    }
+                }
+            },
+        }
+        return self
+
+    def schemas(self) -> List[Dict[str, Any]]:
+        """Tool definitions in the format of the chat API's tools parameter"""
+        return [tool["schema"] for tool in self._tools.values()]
+
+    async def _call(self, name: str, args: Dict[str, Any]) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        tool = self._tools.get(name)
+        try:
+            result = await tool["fn"](**args) if tool else f"Error: unknown tool {name}"
+        except Exception as e:
+            result = f"Error: {e}"
+        return result, time.perf_counter() - start
+
+    async def execute(self, calls: List[Dict[str, Any]]) -> List[Tuple[Any, float]]:
+        """
+        Run the tool calls of one turn
+
+        Calls run concurrently, except those of sequential tools, which run one by one
+        once the others have finished.
+
+        Args:
+            calls: Tool calls with parsed arguments (see Conversation.add_response)
+
+        Returns:
+            (result, seconds) per call, in call order
+        """
+        results: List[Optional[Tuple[Any, float]]] = [None] * len(calls)
+        parallel = [i for i, c in enumerate(calls)
+                    if not self._tools.get(c["function"]["name"], {}).get("sequential")]
+        done = await asyncio.gather(*(self._call(calls[i]["function"]["name"], calls[i]["function"]["arguments"])
+                                      for i in parallel))
+        for i, res in zip(parallel, done):
+            results[i] = res
+        for i, call in enumerate(calls):
+            if results[i] is None:
+                results[i] = await self._call(call["function"]["name"], call["function"]["arguments"])
+        return results
+
+async def run_tool_loop(
+    chat: Callable[[List[Dict[str, Any]], List[Dict[str, Any]]], Awaitable[Dict[str, Any]]],
+    conv: Conversation,
+    registry: ToolRegistry,
+    max_turns: int = DEFAULT_MAX_TURNS,
+    time_budget: float = DEFAULT_TIME_BUDGET,
+    compact: Optional[Callable[[Conversation], Optional[Dict[str, Any]]]] = None
+) -> Dict[str, Any]:
+    """
+    Alternate model calls and tool calls until the model answers
+
+    Each turn sends the conversation to the model and, if it asked for tools and
+    another turn is allowed, runs the calls and appends their results. Every turn
+    sends the same tools, so the server can reuse the cached prompt; before the last
+    turn of a loop with more than one turn, FINAL_ANSWER_PROMPT is appended instead, so
+    the model answers from the results it has. Tool calls of the last turn are not run.
+
+    Args:
+        chat: Coroutine function sending (messages, tools) to the model and returning
+            the response dictionary
+        conv: Conversation holding the prompt; its tools default to the registry's
+        registry: Tools the model may call
+        max_turns: Maximum number of model calls
+        time_budget: Seconds the whole loop may take; a model or tool call still
+            running when it expires is cancelled
+        compact: Called with the conversation before each model call to keep it inside
+            the context window (see ContextBudget.compact); returns a record of what it
+            compacted, or None
+
+    Returns:
+        Dictionary with the last response, its content, stop (one of the STOP_*
+        values), wall_s, and turns: per turn, the parsed tool calls, chat_s, tools_s
+        (wall time of the turn's tool calls), tool_time_s (their summed durations) and
+        compaction (the record returned by compact before the turn's model call)
+    """
+    if conv.tools is None:
+        conv.tools = registry.schemas()
+    start = time.perf_counter()
+    response: Dict[str, Any] = {}
+    turns: List[Dict[str, Any]] = []
+    stop = STOP_MAX_TURNS
+    for turn in range(max_turns):
+        if turn and turn == max_turns - 1:
+            conv.user(FINAL_ANSWER_PROMPT)
+        compaction = compact(conv) if compact else None
+        t0 = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(chat(conv.messages, conv.tools), time_budget - (t0 - start))
+        except asyncio.TimeoutError:
+            stop = STOP_DEADLINE
+            break
+        calls = conv.add_response(response)
+        record = {"calls": calls, "chat_s": time.perf_counter() - t0, "tools_s": 0.0, "tool_time_s": 0.0,
+                  "compaction": compaction}
+        turns.append(record)
+        if "error" in response:
+            stop = STOP_ERROR
+            break
+        if not calls:
+            stop = STOP_ANSWER
+            break
+        if turn == max_turns - 1:
+            break
+
+        t1 = time.perf_counter()
+        try:
+            results = await asyncio.wait_for(registry.execute(calls), time_budget - (t1 - start))
+        except asyncio.TimeoutError:
+            stop = STOP_DEADLINE
+            break
+        for call, (result, _) in zip(calls, results):
+            conv.tool(call["function"]["name"], result)
+        record["tools_s"] = time.perf_counter() - t1
+        record["tool_time_s"] = sum(seconds for _, seconds in results)
+
+    return {
+        "response": response,
+        "content": response.get("message", {}).get("content"),
+        "stop": stop,
+        "wall_s": time.perf_counter() - start,
+        "turns": turns,
+    }
+
+def loop_stats(loop: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flatten a tool loop result into a metrics record
+
+    Returns:
+        Dictionary with turns, tool_calls, stop, wall_s, chat_s, tools_s, tool_time_s,
+        compactions (turns preceded by a compaction) and compacted_chat_s (chat time of
+        those turns)
+    """
+    turns = loop["turns"]
+    compacted = [t for t in turns if t.get("compaction")]
+    return {
+        "turns": len(turns),
+        "tool_calls": sum(len(t["calls"]) for t in turns),
+        "stop": loop["stop"],
+        "wall_s": loop["wall_s"],
+        "chat_s": sum(t["chat_s"] for t in turns),
+        "tools_s": sum(t["tools_s"] for t in turns),
+        "tool_time_s": sum(t["tool_time_s"] for t in turns),
+        "compactions": len(compacted),
+        "compacted_chat_s": sum(t["chat_s"] for t in compacted),
+    }
@@ -0,0 +1,115 @@
+import json
+import queue
+import atexit
+import logging
+import threading
+import weakref
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Union
+
+TRANSCRIPT_LOGGER = "ollama_transcript"
+DEFAULT_TRANSCRIPT_PATH = "ollama_transcript.jsonl"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "OFF": logging.CRITICAL + 1}
+
+# Loggers whose listener is running; closed (flushed) at interpreter exit
+_open_loggers: "weakref.WeakSet[TranscriptLogger]" = weakref.WeakSet()
+
+def _close_open_loggers() -> None:
+    for transcript in list(_open_loggers):
+        transcript.close()
+
+atexit.register(_close_open_loggers)
+
+class JSONLFormatter(logging.Formatter):
+    """Formats a transcript record as one compact JSON line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": record.created, "level": record.levelname, "event": record.msg,
+                 "thread": record.threadName}
+        entry.update(getattr(record, "transcript", {}))
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    Queue handler that enqueues records untouched
+
+    QueueHandler.prepare formats the record in the calling thread; skipping it leaves
+    all JSON serialization to the background listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class TranscriptLogger:
+    """
+    Background JSONL logger for chat transcripts
+
+    log() only puts a record on a queue; a listener thread serializes it and appends
+    it to a size-capped, rotating JSONL file. Records below the configured level are
+    dropped before anything is copied or serialized. The listener thread is started
+    by start(), or by the first record logged, so creating a logger costs nothing.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_TRANSCRIPT_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        level: Union[int, str] = logging.INFO
+    ):
+        self.path = path
+        self._logger = logging.getLogger(TRANSCRIPT_LOGGER)
+        self._logger.propagate = False
+        self._logger.setLevel(LEVELS[level] if isinstance(level, str) else level)
+
+        self._file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                 encoding="utf-8", delay=True)
+        self._file_handler.setFormatter(JSONLFormatter())
+        self._queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self._queue_handler = _LazyQueueHandler(self._queue)
+        self._listener = QueueListener(self._queue, self._file_handler)
+        self._logger.addHandler(self._queue_handler)
+        self._started = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the listener thread (once); it is stopped by close() or at exit"""
+        with self._lock:
+            if self._started or self._closed:
+                return
+            self._listener.start()
+            self._started = True
+            _open_loggers.add(self)
+
+    def enabled_for(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def log(self, event: str, level: int = logging.INFO, **fields: Any) -> None:
+        """
+        Queue a transcript record
+
+        Args:
+            event: Record type (e.g. "prompt", "response")
+            level: Logging level of the record
+            fields: JSON-serializable payload; serialized later by the listener thread
+        """
+        if self._logger.isEnabledFor(level):
+            if not self._started:
+                self.start()
+            self._logger.log(level, event, extra={"transcript": fields})
+
+    def close(self) -> None:
+        """Flush queued records and release the file"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            started = self._started
+        self._logger.removeHandler(self._queue_handler)
+        if started:
+            self._listener.stop()
+            _open_loggers.discard(self)
+        self._file_handler.close()
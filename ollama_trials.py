@@ -0,0 +1,132 @@
+import math
+from statistics import NormalDist
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_MAX_TRIALS = 12
+DEFAULT_MIN_TRIALS = 1
+# A probe passes when its true pass rate is at least this
+DEFAULT_THRESHOLD = 0.5
+# Half-width of the indifference region around the threshold tested by the SPRT
+DEFAULT_MARGIN = 0.2
+
+PASS = "pass"
+FAIL = "fail"
+INCONCLUSIVE = "inconclusive"
+
+def wilson_interval(passes: int, trials: int, confidence: float = DEFAULT_CONFIDENCE) -> Tuple[float, float]:
+    """
+    Wilson score interval of a pass rate
+
+    Args:
+        passes: Number of passed trials
+        trials: Number of trials
+        confidence: Confidence level of the interval
+
+    Returns:
+        Tuple of (lower, upper) bound; (0, 1) without trials
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    p = passes / trials
+    denom = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denom
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+class SequentialTest:
+    """
+    Wald's sequential probability ratio test of a pass rate
+
+    Tests H0: p <= threshold - margin against H1: p >= threshold + margin with error rates
+    of 1 - confidence each. After every trial the log likelihood ratio is compared with
+    the two Wald boundaries; crossing one decides the test. Models far from the threshold
+    cross after a handful of trials, borderline ones keep sampling.
+    """
+
+    def __init__(self, confidence: float = DEFAULT_CONFIDENCE, threshold: float = DEFAULT_THRESHOLD,
+                 margin: float = DEFAULT_MARGIN):
+        p0 = max(threshold - margin, 1e-6)
+        p1 = min(threshold + margin, 1 - 1e-6)
+        error = 1 - confidence
+        self._pass_step = math.log(p1 / p0)
+        self._fail_step = math.log((1 - p1) / (1 - p0))
+        self._upper = math.log((1 - error) / error)
+        self._lower = math.log(error / (1 - error))
+        self.llr = 0.0
+
+    def update(self, passed: bool) -> Optional[str]:
+        """
+        Add a trial outcome
+
+        Returns:
+            PASS or FAIL once a boundary is crossed, otherwise None
+        """
+        self.llr += self._pass_step if passed else self._fail_step
+        if self.llr >= self._upper:
+            return PASS
+        if self.llr <= self._lower:
+            return FAIL
+        return None
+
+async def run_adaptive_trials(
+    probe: Callable[[], Awaitable[Any]],
+    is_pass: Callable[[Any], bool],
+    confidence: float = DEFAULT_CONFIDENCE,
+    max_trials: int = DEFAULT_MAX_TRIALS,
+    min_trials: int = DEFAULT_MIN_TRIALS,
+    threshold: float = DEFAULT_THRESHOLD,
+    margin: float = DEFAULT_MARGIN
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Repeat a probe until a sequential test decides whether it passes
+
+    Args:
+        probe: Coroutine function running the probe once
+        is_pass: Tells whether a probe result passed
+        confidence: Confidence of the pass/fail decision and of the reported interval
+        max_trials: Trials after which sampling stops undecided
+        min_trials: Trials always run, even if the test decides earlier
+        threshold: Pass rate separating passing from failing probes
+        margin: Half-width of the indifference region around the threshold
+
+    Returns:
+        Tuple of (a probe result agreeing with the verdict, trial summary). The summary
+        holds trials, passes, pass_rate, ci_low, ci_high and verdict (PASS, FAIL or
+        INCONCLUSIVE when max_trials ran out; then pass_rate decides success).
+    """
+    test = SequentialTest(confidence, threshold, margin)
+    outcomes: List[Tuple[bool, Any]] = []
+    decision = None
+    while len(outcomes) < max_trials:
+        result = await probe()
+        passed = bool(is_pass(result))
+        outcomes.append((passed, result))
+        # The first boundary crossed decides; trials run to reach min_trials cannot undo it
+        if decision is None:
+            decision = test.update(passed)
+        if decision is not None and len(outcomes) >= min_trials:
+            break
+
+    passes = sum(1 for passed, _ in outcomes if passed)
+    pass_rate = passes / len(outcomes)
+    low, high = wilson_interval(passes, len(outcomes), confidence)
+    success = decision == PASS if decision is not None else pass_rate >= threshold
+    representative = next((r for passed, r in reversed(outcomes) if passed == success), outcomes[-1][1])
+    return representative, {
+        "trials": len(outcomes),
+        "passes": passes,
+        "pass_rate": pass_rate,
+        "ci_low": low,
+        "ci_high": high,
+        "confidence": confidence,
+        "verdict": decision or INCONCLUSIVE,
+        "success": success,
+    }
+
+def describe_trials(summary: Dict[str, Any]) -> str:
+    """One-line description of a trial summary for reasons and reports"""
+    return (f"{summary['passes']}/{summary['trials']} trials passed, "
+            f"{summary['confidence']:.0%} CI {summary['ci_low']:.2f}-{summary['ci_high']:.2f}, "
+            f"{summary['verdict']}")
@@ -0,0 +1,17 @@
+from ollama_search_merge import canonical_url, merge_results
+
+
+def test_canonical_url_normalizes():
+    assert canonical_url("http://WWW.Example.com:443/a/?utm_source=x&b=2&a=1#frag") == "https://example.com/a?a=1&b=2"
+
+
+def test_canonical_url_keeps_malformed_urls():
+    assert canonical_url(" http://example.com:80a/x ") == "http://example.com:80a/x"
+    assert canonical_url("http://[::1/") == "http://[::1/"
+
+
+def test_merge_results_survives_malformed_urls():
+    merged, stats = merge_results(["T - http://example.com:80a/x - s", "U - http://[::1/ - t",
+                                   "Good - https://example.org/page - snippet"])
+    assert "Good - https://example.org/page - snippet" in merged
+    assert stats["merged_items"] == 3